@@ -0,0 +1,20 @@
+import functools
+
+from xlsxfile import get_resource_path
+
+
+@functools.lru_cache(maxsize=None)
+def get_logo_icon():
+    """
+    Returns the application logo as a 32x32 Tkinter image.
+
+    The logo is decoded and resized once and then shared by every window. A Tk root must exist before calling this.
+    """
+    from PIL import Image, ImageTk
+
+    # Open the logo image and resize it to fit the application.
+    png_image = Image.open(get_resource_path("mqm_logo.png"))
+    png_image = png_image.resize((32, 32))
+
+    # Convert the image to a format that Tkinter can use.
+    return ImageTk.PhotoImage(png_image)
@@ -0,0 +1,263 @@
+import argparse
+import collections
+import glob
+import json
+import multiprocessing
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from conversioncache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, ConversionCache
+from sheetreaders import SUPPORTED_EXTENSIONS
+from xlsxfile import XlsxFile
+
+
+def find_workbooks(inputs):
+    """
+    Expands the given files, directories and glob patterns into a sorted list of typology files
+    (XLSX, ODS, CSV or TSV).
+
+    Parameters:
+    - inputs: A list of file paths, directory paths or glob patterns.
+
+    Returns:
+    - A sorted list of unique file paths.
+    """
+    workbooks = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            # Collect every supported file inside the directory tree.
+            matches = [match for extension in SUPPORTED_EXTENSIONS
+                       for match in glob.glob(os.path.join(item, "**", "*" + extension), recursive=True)]
+        elif os.path.isfile(item):
+            matches = [item]
+        else:
+            matches = glob.glob(item, recursive=True)
+        # Skip the lock files Excel leaves next to open workbooks.
+        workbooks.update(os.path.abspath(match) for match in matches
+                         if match.lower().endswith(SUPPORTED_EXTENSIONS) and not os.path.basename(match).startswith("~$"))
+    return sorted(workbooks)
+
+
+def select_sheets(worksheet, sheet_names, sheet_pattern):
+    """
+    Selects the sheets of a workbook to convert.
+
+    Parameters:
+    - worksheet: The XlsxFile to select sheets from.
+    - sheet_names: Exact sheet names to convert, or an empty list.
+    - sheet_pattern: A regular expression matched against sheet names, or None.
+
+    Returns:
+    - A list of sheet names. When no names or pattern are given, the sheets containing an "MQM" header are returned.
+    """
+    if not sheet_names and sheet_pattern is None:
+        return worksheet.get_mqm_sheet_names()
+
+    selected = []
+    for sheet_name in worksheet.get_sheet_names():
+        if sheet_name in sheet_names or (sheet_pattern is not None and re.search(sheet_pattern, sheet_name)):
+            selected.append(sheet_name)
+    return selected
+
+
+def get_output_stems(workbooks, output_dir):
+    """
+    Chooses where the XML files of each workbook are written.
+
+    With an output directory, the folders of the workbooks below the folder they have in common are mirrored in it,
+    so workbooks with the same name in different folders are written to different files. Otherwise the XML is
+    written next to each workbook. Workbooks that would still share a name, such as typology.xlsx and
+    typology.csv, keep their extension in it.
+
+    Parameters:
+    - workbooks: The absolute paths of the workbooks to convert.
+    - output_dir: The output directory, or None to write next to each workbook.
+
+    Returns:
+    - A dictionary mapping each workbook to its output path without the '.xml' extension.
+
+    Raises:
+    - ValueError if two workbooks would still be written to the same file.
+    """
+    common_dir = os.path.commonpath([os.path.dirname(workbook) for workbook in workbooks]) if output_dir else None
+    stems = {}
+    for workbook in workbooks:
+        directory = os.path.dirname(workbook)
+        if output_dir:
+            directory = os.path.normpath(os.path.join(output_dir, os.path.relpath(directory, common_dir)))
+        stems[workbook] = os.path.join(directory, os.path.splitext(os.path.basename(workbook))[0])
+
+    # Keep the extension of workbooks whose names would clash.
+    counts = collections.Counter(os.path.normcase(stem) for stem in stems.values())
+    for workbook, stem in stems.items():
+        if counts[os.path.normcase(stem)] > 1:
+            stems[workbook] = stem + os.path.splitext(workbook)[1]
+
+    owners = {}
+    for workbook, stem in stems.items():
+        owner = owners.setdefault(os.path.normcase(stem), workbook)
+        if owner != workbook:
+            raise ValueError(f"{owner} and {workbook} would both be written to {stem}.xml")
+    return stems
+
+
+def output_path(output_stem, sheet_name, single_sheet):
+    """
+    Builds the XML output path for a converted sheet.
+
+    The file is named after the workbook, with the sheet name appended when more than one sheet is converted.
+    """
+    if not single_sheet:
+        safe_sheet_name = re.sub(r"[^\w-]+", "_", sheet_name)
+        output_stem = f"{output_stem}_{safe_sheet_name}"
+    return f"{output_stem}.xml"
+
+
+def claim_output(claims, output_file, owner):
+    """
+    Reserves an output file for one conversion, so that no other conversion of the batch overwrites it.
+
+    Parameters:
+    - claims: A dictionary shared by the worker processes, mapping each output file to the conversion writing it.
+    - output_file: The output file to reserve.
+    - owner: A label for the conversion.
+
+    Returns:
+    - None if the file was reserved, otherwise the label of the conversion that reserved it first.
+    """
+    if claims is None:
+        return None
+    # setdefault is a single call to the process holding the dictionary, so two workers can't both reserve a file.
+    current = claims.setdefault(os.path.normcase(output_file), owner)
+    return None if current == owner else current
+
+
+def convert_workbook(input_file, output_stem, sheet_names, sheet_pattern, stream, cache=None, profile_dir=None,
+                     combined=False, index=False, claims=None):
+    """
+    Converts the selected sheets of one workbook to XML files named after 'output_stem'. Runs inside a worker process.
+    Unchanged sheets are copied from 'cache' when a ConversionCache is given.
+    When 'profile_dir' is given, a cProfile dump is written there for each sheet.
+    When 'combined' is True, all the selected sheets are written to a single XML file.
+    When 'index' is True, a typology index is written next to each XML file with the '.idx' extension.
+    When 'claims' is given, a sheet whose output file another conversion already reserved (see claim_output)
+    fails instead of overwriting it.
+
+    Returns:
+    - A list of (input_file, sheet_name, output_file, success, message, stage_records) tuples.
+    """
+    try:
+        worksheet = XlsxFile(input_file)
+        selected = select_sheets(worksheet, sheet_names, sheet_pattern)
+    except Exception as e:
+        return [(input_file, None, None, False, str(e), [])]
+
+    if not selected:
+        return [(input_file, None, None, False, "No matching worksheet found", [])]
+
+    if combined:
+        output_file = output_path(output_stem, None, True)
+        owner = claim_output(claims, output_file, input_file)
+        if owner is not None:
+            message = f"{output_file} is already written for {owner}"
+            return [(input_file, ", ".join(selected), output_file, False, message, [])]
+        results = worksheet.convert_all_to_xml(output_file, selected, combined=True)
+        return [(input_file, ", ".join(selected), output_file, success, message, worksheet.stage_records)
+                for _, output_file, success, message in results]
+
+    results = []
+    for sheet_name in selected:
+        output_file = output_path(output_stem, sheet_name, len(selected) == 1)
+        owner = claim_output(claims, output_file, f"{input_file} [{sheet_name}]")
+        if owner is not None:
+            message = f"{output_file} is already written for {owner}"
+            results.append((input_file, sheet_name, output_file, False, message, []))
+            continue
+        profile_file = None
+        if profile_dir is not None:
+            profile_file = os.path.join(profile_dir, os.path.basename(output_file)[:-len(".xml")] + ".prof")
+        index_file = output_file[:-len(".xml")] + ".idx" if index else None
+        success, message = worksheet.convert_to_xml(sheet_name, output_file, stream=stream, cache=cache,
+                                                    profile_file=profile_file, index_file=index_file)
+        results.append((input_file, sheet_name, output_file, success, message, worksheet.stage_records))
+    return results
+
+
+def main(argv=None):
+    """
+    Converts MQM typology workbooks to XML without the GUI.
+
+    Returns:
+    - The process exit code: 0 if every conversion succeeded, otherwise 1.
+    """
+    parser = argparse.ArgumentParser(description="Convert MQM typology workbooks to typology XML.")
+    parser.add_argument("inputs", nargs="+", help="XLSX, ODS, CSV or TSV files, directories or glob patterns to convert")
+    parser.add_argument("-s", "--sheet", action="append", default=[], dest="sheet_names",
+                        help="name of a worksheet to convert (can be repeated)")
+    parser.add_argument("-r", "--sheet-regex", dest="sheet_pattern",
+                        help="convert the worksheets whose names match this regular expression")
+    parser.add_argument("-o", "--output-dir", help="directory for the XML files (default: next to each workbook)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--stream", action="store_true", help="write the XML incrementally")
+    parser.add_argument("--combined", action="store_true",
+                        help="write the error types of all selected sheets of a workbook to one XML file")
+    parser.add_argument("--cache", action="store_true", help="reuse cached conversions of unchanged workbooks")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="conversion cache directory")
+    parser.add_argument("--max-cache-size", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="conversion cache size limit in MB")
+    parser.add_argument("--index", action="store_true",
+                        help="also write a memory-mappable id index (.idx) next to each XML file")
+    parser.add_argument("--json", action="store_true",
+                        help="print a JSON report with per-stage timings instead of the text summary")
+    parser.add_argument("--profile-dir", help="write a cProfile dump for each converted sheet to this directory")
+    args = parser.parse_args(argv)
+
+    workbooks = find_workbooks(args.inputs)
+    if not workbooks:
+        print("No XLSX, ODS, CSV or TSV files found.", file=sys.stderr)
+        return 1
+    try:
+        output_stems = get_output_stems(workbooks, args.output_dir)
+    except ValueError as e:
+        print(f"Output files would clash: {e}", file=sys.stderr)
+        return 1
+    for directory in {os.path.dirname(stem) for stem in output_stems.values()} | {args.profile_dir}:
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    cache = ConversionCache(args.cache_dir, args.max_cache_size * 1024 * 1024) if args.cache else None
+
+    failures = 0
+    report = []
+    # The output files each worker reserves, so that sheets of different workbooks never overwrite each other.
+    with multiprocessing.Manager() as manager, ProcessPoolExecutor(max_workers=args.workers) as executor:
+        claims = manager.dict()
+        futures = [executor.submit(convert_workbook, workbook, output_stems[workbook], args.sheet_names,
+                                   args.sheet_pattern, args.stream, cache, args.profile_dir, args.combined, args.index,
+                                   claims)
+                   for workbook in workbooks]
+        for future in futures:
+            for input_file, sheet_name, output_file, success, message, stage_records in future.result():
+                report.append({"input": input_file, "sheet": sheet_name, "output": output_file,
+                               "success": success, "message": message, "stages": stage_records})
+                if not success:
+                    failures += 1
+                if args.json:
+                    continue
+                label = input_file if sheet_name is None else f"{input_file} [{sheet_name}]"
+                if success:
+                    print(f"OK    {label} -> {output_file}")
+                else:
+                    print(f"FAIL  {label}: {message}")
+
+    if args.json:
+        print(json.dumps({"conversions": report, "succeeded": len(report) - failures, "failed": failures},
+                         indent=2))
+    else:
+        print(f"{len(report) - failures} succeeded, {failures} failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
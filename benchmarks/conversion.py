@@ -0,0 +1,212 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# The repository root, which holds the application modules.
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from generate_workbook import generate_workbook  # noqa: E402
+
+try:
+    import resource
+except ImportError:
+    # The resource module is not available on Windows, so peak memory is not reported there.
+    resource = None
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+WORKBOOK_DIR = os.path.join(tempfile.gettempdir(), "mqm-typology-benchmarks")
+
+
+def get_memory():
+    # Return the current and peak resident memory of this process in MB. Where /proc isn't available, the current
+    # memory is None and the peak comes from getrusage, or is None as well if it can't be measured.
+    try:
+        with open("/proc/self/status") as file:
+            values = dict(line.split(":", 1) for line in file)
+        return int(values["VmRSS"].split()[0]) / 1024, int(values["VmHWM"].split()[0]) / 1024
+    except (OSError, KeyError, ValueError):
+        pass
+    if resource is None:
+        return None, None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return None, peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def reset_peak_memory():
+    # Lower the recorded peak resident memory to the current one, so the next reading is the peak of one stage.
+    # Linux allows this through /proc/self/clear_refs. Return whether it worked.
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def get_case_name(rows, depth, fan_out, text_lines, duplicate_rate=0.0, banner_rows=2):
+    name = f"{rows}rows-d{depth}-f{fan_out}-t{text_lines}"
+    # Only name the knobs that differ from their defaults, so existing baselines keep their case names.
+    if duplicate_rate:
+        name += f"-dup{duplicate_rate:g}"
+    if banner_rows != 2:
+        name += f"-b{banner_rows}"
+    return name
+
+
+def run_case(workbook, rows):
+    """
+    Converts a workbook one stage at a time. Runs in a fresh process so the memory readings belong to that case.
+
+    Returns:
+    - A list of (stage, seconds, memory in MB) tuples. The memory is the peak a stage reached above the memory in use
+      when it started, or, where peaks can't be reset, how much the process's peak grew during the stage.
+    - A note about the case, such as the problems that stopped it, or None.
+    """
+    # Import pandas up front so that its import time isn't counted in the first stage.
+    import pandas  # noqa: F401
+    from lxml import etree
+
+    from xlsxfile import XlsxFile
+
+    results = []
+    xlsx_file = XlsxFile(workbook)
+    xml_file = os.path.join(WORKBOOK_DIR, f"{os.getpid()}.xml")
+
+    def timed(stage, function, *args):
+        reset = reset_peak_memory()
+        current, peak = get_memory()
+        start = time.perf_counter()
+        value = function(*args)
+        seconds = time.perf_counter() - start
+        _, peak_after = get_memory()
+        memory = None
+        if peak_after is not None:
+            memory = peak_after - (current if reset and current is not None else peak)
+        results.append((stage, seconds, memory))
+        return value
+
+    def nest():
+        order = xlsx_file.order_error_types()
+        problems = xlsx_file.find_hierarchy_problems(order)
+        if problems:
+            raise ValueError(problems[0])
+        xlsx_file.nest_error_type_elements(order, typology_element)
+        return order
+
+    def serialize():
+        tree = etree.ElementTree(typology_element)
+        etree.indent(tree, space="\t", level=0)
+        tree.write(xml_file, encoding="utf-8", xml_declaration=True)
+
+    timed("open", xlsx_file.get_sheet_names)
+    mqm_index = timed("find_mqm_and_prepare_df", xlsx_file.find_mqm_and_prepare_df, "Typology")
+    success, message, rows = timed("read_worksheet_rows", xlsx_file.read_worksheet_rows, mqm_index)
+    if not success:
+        raise ValueError(message)
+    problems = timed("validate_rows", xlsx_file.validate_rows, rows)
+    if problems:
+        # A conversion stops here too, so the stages after it have nothing to time.
+        return results, f"{len(problems)} problems reported, later stages skipped"
+    xlsx_file.index_rows(rows)
+    timed("build_elements", xlsx_file.build_error_type_elements, rows)
+    typology_element = etree.Element("typology", edition="MQM2021")
+    order = timed("nest", nest)
+    timed("validate_element", xlsx_file.validate_element, typology_element)
+    timed("serialize", serialize)
+    timed("validate_xml", xlsx_file.validate_xml, xml_file)
+    # A streamed conversion writes the rows themselves, without the elements built above.
+    xlsx_file.issue_rows = {row[1]: row for row in rows}
+    timed("serialize_stream", xlsx_file.write_xml_incrementally, order, xml_file)
+    os.remove(xml_file)
+    return results, None
+
+
+def main(argv=None):
+    """
+    Times each conversion stage on synthetic workbooks and compares throughput with the stored baseline.
+
+    Baselines depend on the machine, so none is shipped. Record one with --save-baseline before comparing.
+
+    Returns:
+    - 1 if any stage is slower than the baseline by more than the tolerance, 2 if a case has no baseline to
+      compare with, otherwise 0.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the conversion stages of XlsxFile.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000], help="workbook sizes to benchmark")
+    parser.add_argument("--depth", type=int, default=4, help="maximum hierarchy depth")
+    parser.add_argument("--fan-out", type=int, default=8, help="children per error type")
+    parser.add_argument("--text-lines", type=int, default=3, help="lines per description/examples/notes cell")
+    parser.add_argument("--duplicate-rate", type=float, default=0.0,
+                        help="fraction of rows with a repeated id (the conversion then stops after validate_rows)")
+    parser.add_argument("--banner-rows", type=int, default=2, help="rows before the MQM header")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed throughput drop relative to the baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    os.makedirs(WORKBOOK_DIR, exist_ok=True)
+    baseline = {}
+    if not args.save_baseline:
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as file:
+                baseline = json.load(file)
+        else:
+            print(f"No baseline at {args.baseline}, so slowdowns can't be detected. "
+                  f"Run with --save-baseline on this machine first.", file=sys.stderr)
+
+    measured = {}
+    regressions = []
+    # The cases without a baseline, whose slowdowns can't be detected.
+    unchecked = []
+    for rows in args.rows:
+        case = get_case_name(rows, args.depth, args.fan_out, args.text_lines, args.duplicate_rate,
+                             args.banner_rows)
+        workbook = os.path.join(WORKBOOK_DIR, f"{case}.xlsx")
+        if not os.path.exists(workbook):
+            generate_workbook(workbook, rows, args.depth, args.fan_out, args.duplicate_rate, args.banner_rows,
+                              args.text_lines)
+
+        # Each case runs in a fresh process so the memory readings belong to that case alone.
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            results, note = executor.submit(run_case, workbook, rows).result()
+
+        print(case if note is None else f"{case} ({note})")
+        if case not in baseline:
+            unchecked.append(case)
+        measured[case] = {}
+        for stage, seconds, memory in results:
+            throughput = rows / seconds if seconds else float("inf")
+            measured[case][stage] = throughput
+            memory_text = f"{memory:8.1f} MB" if memory is not None else ""
+            line = f"  {stage:<24}{seconds * 1000:10.1f} ms{throughput:14,.0f} rows/s  {memory_text}"
+
+            expected = baseline.get(case, {}).get(stage)
+            if expected and throughput < expected * (1 - args.tolerance):
+                line += f"  SLOWER than baseline {expected:,.0f} rows/s"
+                regressions.append((case, stage))
+            print(line)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(measured, file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"{len(regressions)} stage(s) slower than the baseline")
+        return 1
+    if unchecked and not args.save_baseline:
+        print(f"No baseline for {', '.join(unchecked)}. Run with --save-baseline to record one.", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import argparse
+import random
+import sys
+
+# The column headers of an MQM typology worksheet.
+HEADERS = ["Name", "Type ID", "Parent", "Type PID", "Description", "Examples", "Notes"]
+
+WORDS = ("accuracy fluency terminology style locale convention audience design markup omission addition "
+         "mistranslation grammar spelling punctuation register inconsistency").split()
+
+
+def make_text(rng, lines):
+    # Build a multi-line cell of random words.
+    return "\n".join(" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(lines))
+
+
+def generate_rows(rows, depth, fan_out, duplicate_rate=0.0, text_lines=1, seed=0):
+    """
+    Yields typology rows in sheet order, depth-first.
+
+    Parameters:
+    - rows: The number of error types to generate.
+    - depth: The maximum depth of the hierarchy.
+    - fan_out: The number of children each error type above the maximum depth gets.
+    - duplicate_rate: The fraction of rows that reuse an earlier id.
+    - text_lines: The number of lines in each description, examples and notes cell.
+    - seed: The random seed, so the same arguments always produce the same workbook.
+    """
+    rng = random.Random(seed)
+    # Each entry holds an open parent's id, level and number of children still to generate.
+    stack = []
+    for number in range(rows):
+        while stack and stack[-1][2] == 0:
+            stack.pop()
+        parent = stack[-1] if stack else None
+        if parent is not None:
+            parent[2] -= 1
+        level = parent[1] + 1 if parent is not None else 0
+
+        type_id = f"error-{number}"
+        if number and rng.random() < duplicate_rate:
+            type_id = f"error-{rng.randrange(number)}"
+
+        yield [f"Error {number}", type_id, parent[0] if parent is not None else None, str(number),
+               make_text(rng, text_lines), make_text(rng, text_lines), make_text(rng, text_lines)]
+
+        if level + 1 < depth:
+            stack.append([type_id, level, fan_out])
+
+
+def generate_workbook(path, rows, depth=4, fan_out=8, duplicate_rate=0.0, banner_rows=2, text_lines=1, seed=0):
+    """
+    Writes a synthetic MQM typology workbook with a single "Typology" sheet.
+
+    The sheet starts with 'banner_rows' rows of text, then the "MQM" header row, then the column headers.
+    """
+    from openpyxl import Workbook
+
+    # Write-only mode keeps memory flat for very large workbooks.
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Typology")
+    for number in range(banner_rows):
+        sheet.append([f"Synthetic typology banner {number}"])
+    sheet.append(["MQM Core Typology"])
+    sheet.append(HEADERS)
+    for row in generate_rows(rows, depth, fan_out, duplicate_rate, text_lines, seed):
+        sheet.append(row)
+    workbook.save(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic MQM typology workbook.")
+    parser.add_argument("path", help="output XLSX path")
+    parser.add_argument("--rows", type=int, default=1000, help="number of error types")
+    parser.add_argument("--depth", type=int, default=4, help="maximum hierarchy depth")
+    parser.add_argument("--fan-out", type=int, default=8, help="children per error type")
+    parser.add_argument("--duplicate-rate", type=float, default=0.0, help="fraction of rows with a repeated id")
+    parser.add_argument("--banner-rows", type=int, default=2, help="rows before the MQM header")
+    parser.add_argument("--text-lines", type=int, default=1, help="lines per description/examples/notes cell")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args(argv)
+
+    generate_workbook(args.path, args.rows, args.depth, args.fan_out, args.duplicate_rate, args.banner_rows,
+                      args.text_lines, args.seed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
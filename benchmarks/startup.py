@@ -0,0 +1,67 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# The repository root, which holds the application modules.
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Importing the GUI must stay under this many seconds (median of the runs).
+STARTUP_TARGET = 0.3
+
+# Modules that must not be imported before the first conversion.
+HEAVY_MODULES = ("pandas", "numpy", "lxml", "PIL")
+
+IMPORT_SCRIPT = f"""
+import sys
+import mainwindow
+print(",".join(name for name in {HEAVY_MODULES!r} if name in sys.modules))
+"""
+
+
+def measure_startup(runs):
+    """
+    Imports the GUI modules in fresh interpreters.
+
+    Returns:
+    - A tuple of the import times in seconds and the heavy modules that were loaded.
+    """
+    timings = []
+    loaded = ""
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], cwd=ROOT_DIR, check=True,
+                                capture_output=True, text=True)
+        timings.append(time.perf_counter() - start)
+        loaded = result.stdout.strip()
+    return timings, loaded
+
+
+def main(argv=None):
+    """
+    Measures GUI startup time and fails if it exceeds the target or loads heavy modules eagerly.
+    """
+    parser = argparse.ArgumentParser(description="Measure the startup time of the MQM Typology Converter.")
+    parser.add_argument("--runs", type=int, default=5, help="number of fresh interpreters to time")
+    parser.add_argument("--target", type=float, default=STARTUP_TARGET, help="startup target in seconds")
+    args = parser.parse_args(argv)
+
+    timings, loaded = measure_startup(args.runs)
+    median = statistics.median(timings)
+    print(f"startup: median {median * 1000:.0f} ms, best {min(timings) * 1000:.0f} ms over {args.runs} runs "
+          f"(target {args.target * 1000:.0f} ms)")
+
+    failed = False
+    if loaded:
+        print(f"FAIL: importing the GUI loaded {loaded}")
+        failed = True
+    if median > args.target:
+        print("FAIL: startup is slower than the target")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
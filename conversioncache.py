@@ -0,0 +1,179 @@
+import argparse
+import functools
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+
+from sheetreaders import is_path
+from xlsxfile import CONVERTER_VERSION, get_schema_path
+
+# The default cache location and size limit.
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mqm-typology-converter")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def hash_file(path):
+    """
+    Returns the SHA-256 hex digest of a file, reading it in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_content(location):
+    """
+    Returns the SHA-256 hex digest of a workbook given as a path, or as in-memory content that XlsxFile accepts:
+    bytes, a bytearray, a memoryview or a seekable binary file object, which is read and rewound.
+    """
+    if is_path(location):
+        return hash_file(location)
+    if isinstance(location, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(location).hexdigest()
+    if not location.seekable():
+        raise ValueError("Cached conversions need a file path, in-memory content or a seekable file object")
+    digest = hashlib.sha256()
+    start = location.tell()
+    for chunk in iter(lambda: location.read(1024 * 1024), b""):
+        digest.update(chunk)
+    location.seek(start)
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def get_schema_hash():
+    # Hash the typology schema once per process.
+    return hash_file(get_schema_path())
+
+
+class ConversionCache:
+    """
+    An on-disk cache of validated typology XML files.
+
+    Entries are keyed by the workbook contents, the sheet name, the converter version and the schema.
+    Entries are evicted least recently used first once the cache grows beyond 'max_bytes'.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def get_key(location, sheet_name):
+        """
+        Builds the cache key for a sheet of a workbook, given as a path or as in-memory content (see hash_content).
+        """
+        digest = hashlib.sha256()
+        for part in (hash_content(location), sheet_name, CONVERTER_VERSION, get_schema_hash()):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, f"{key}.xml")
+
+    def fetch(self, key, xml_file):
+        """
+        Copies the cached XML for 'key' to 'xml_file'.
+
+        Returns:
+        - True on a cache hit, otherwise False.
+        """
+        entry = self.entry_path(key)
+        try:
+            shutil.copyfile(entry, xml_file)
+        except FileNotFoundError:
+            return False
+        # Mark the entry as recently used. Another process may have evicted it since it was copied,
+        # which doesn't matter, as the copy is complete.
+        try:
+            os.utime(entry)
+        except FileNotFoundError:
+            pass
+        return True
+
+    def store(self, key, xml_file):
+        """
+        Adds a validated XML file to the cache and evicts old entries if the cache is too large.
+        """
+        # Copy to a temporary file first so other processes never see a partial entry.
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(handle)
+        try:
+            shutil.copyfile(xml_file, temp_path)
+            os.replace(temp_path, self.entry_path(key))
+        except OSError:
+            os.remove(temp_path)
+            raise
+        self.evict()
+
+    def get_entries(self):
+        # Return (modification time, size, path) for every entry.
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".xml"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits within 'max_bytes'.
+        """
+        entries = sorted(self.get_entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        """
+        Removes every entry from the cache.
+
+        Returns:
+        - The number of entries removed.
+        """
+        removed = 0
+        for _, _, path in self.get_entries():
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+def main(argv=None):
+    """
+    Inspects or clears the conversion cache.
+    """
+    parser = argparse.ArgumentParser(description="Manage the MQM typology conversion cache.")
+    parser.add_argument("command", choices=["clear", "info"], help="clear the cache or show its size")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="cache directory")
+    args = parser.parse_args(argv)
+
+    cache = ConversionCache(args.cache_dir)
+    if args.command == "clear":
+        print(f"Removed {cache.clear()} cached conversions from {cache.directory}")
+    else:
+        entries = cache.get_entries()
+        total = sum(size for _, size, _ in entries)
+        print(f"{len(entries)} cached conversions, {total} bytes in {cache.directory}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+import argparse
+import collections
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from xlsxfile import XlsxFile, get_xsd_schema
+
+# How many recent request latencies are kept for the percentiles reported by /health.
+LATENCY_WINDOW = 1000
+
+
+def warm_worker():
+    # Pay for the pandas, openpyxl and lxml imports and the schema compile once per worker process,
+    # instead of on the first upload it handles.
+    import openpyxl  # noqa: F401
+    import pandas  # noqa: F401
+    get_xsd_schema()
+
+
+def convert_upload(data, sheet_name, stream=False):
+    """
+    Converts an uploaded workbook. Runs inside a worker process.
+
+    Returns:
+    - A tuple of success, an error message, the XML bytes, and the stage records of the conversion.
+    """
+    # The upload is converted in memory, without temporary files.
+    worksheet = XlsxFile(data)
+    success, message, xml = worksheet.convert_to_bytes(sheet_name, stream=stream)
+    worksheet.reload()
+    return success, message, xml, worksheet.stage_records
+
+
+def get_percentile(sorted_values, percentile):
+    # Nearest-rank percentile of an already sorted list.
+    if not sorted_values:
+        return None
+    rank = max(0, int(round(percentile / 100 * len(sorted_values))) - 1)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class ConversionService:
+    """
+    Converts uploads on a pool of warm worker processes.
+
+    At most 'max_pending' conversions are queued or running at once. Further uploads are rejected straight away
+    so that clients can retry, rather than piling up behind a slow conversion.
+    """
+
+    def __init__(self, workers=None, max_pending=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 2
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_worker)
+        self.slots = threading.BoundedSemaphore(self.max_pending)
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.started = time.time()
+
+    def warm_up(self):
+        # Start every worker now, so the first uploads don't pay for process startup.
+        for future in [self.executor.submit(warm_worker) for _ in range(self.workers)]:
+            future.result()
+
+    def convert(self, data, sheet_name, stream=False):
+        """
+        Converts an uploaded workbook on the worker pool.
+
+        Returns:
+        - None if the queue is full, otherwise the result of convert_upload.
+        """
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            return None
+        start = time.perf_counter()
+        with self.lock:
+            self.pending += 1
+        try:
+            result = self.executor.submit(convert_upload, data, sheet_name, stream).result()
+        except Exception as e:
+            result = (False, str(e), b"", [])
+        finally:
+            self.slots.release()
+        with self.lock:
+            self.pending -= 1
+            self.latencies.append(time.perf_counter() - start)
+            if result[0]:
+                self.completed += 1
+            else:
+                self.failed += 1
+        return result
+
+    def get_metrics(self):
+        # Return the service counters and latency percentiles in milliseconds.
+        with self.lock:
+            latencies = sorted(self.latencies)
+            metrics = {
+                "status": "ok",
+                "uptime_seconds": round(time.time() - self.started, 1),
+                "workers": self.workers,
+                "pending": self.pending,
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            }
+        metrics["latency_ms"] = {
+            f"p{percentile}": None if value is None else round(value * 1000, 1)
+            for percentile in (50, 90, 99)
+            for value in [get_percentile(latencies, percentile)]
+        }
+        return metrics
+
+    def shutdown(self):
+        self.executor.shutdown(cancel_futures=True)
+
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handles the service endpoints:
+    - POST /convert?sheet=NAME[&stream=1] with the XLSX file as the request body returns the typology XML,
+      with the stage records of the conversion as JSON in the X-Conversion-Stages header, or a JSON error report.
+    - GET /health returns the service counters and latency percentiles as JSON.
+    """
+
+    server_version = "MQMTypologyConverter"
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/health":
+            self.send_json(200, self.server.service.get_metrics())
+        else:
+            self.send_json(404, {"success": False, "errors": ["Not found"]})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/convert":
+            self.send_json(404, {"success": False, "errors": ["Not found"]})
+            return
+        query = parse_qs(url.query)
+        sheet_name = query.get("sheet", [None])[0]
+        stream = query.get("stream", ["0"])[0] in ("1", "true")
+        if not sheet_name:
+            self.send_json(400, {"success": False, "errors": ["The 'sheet' query parameter is required"]})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            self.send_json(411, {"success": False, "errors": ["Content-Length is required"]})
+            return
+        if length > self.server.max_upload_bytes:
+            self.send_json(413, {"success": False, "errors": ["The upload is too large"]})
+            return
+        data = self.rfile.read(length)
+
+        result = self.server.service.convert(data, sheet_name, stream)
+        if result is None:
+            self.send_json(503, {"success": False, "errors": ["The conversion queue is full, try again later"]},
+                           {"Retry-After": "1"})
+            return
+        success, message, xml, stage_records = result
+        if not success:
+            # Hierarchy problems are reported one per line.
+            self.send_json(422, {"success": False, "errors": message.splitlines() or [message],
+                                 "stages": stage_records})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(xml)))
+        self.send_header("X-Conversion-Stages", json.dumps(stage_records, separators=(",", ":")))
+        self.end_headers()
+        self.wfile.write(xml)
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class ConversionServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service, max_upload_bytes, quiet=False):
+        super().__init__(address, ConversionRequestHandler)
+        self.service = service
+        self.max_upload_bytes = max_upload_bytes
+        self.quiet = quiet
+
+
+def main(argv=None):
+    """
+    Serves typology conversions over HTTP on the local machine.
+    """
+    parser = argparse.ArgumentParser(description="Serve MQM typology conversions over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--max-pending", type=int,
+                        help="conversions queued or running before uploads are rejected (default: 2 per worker)")
+    parser.add_argument("--max-upload-size", type=int, default=50, help="upload size limit in MB")
+    parser.add_argument("--quiet", action="store_true", help="don't log requests")
+    args = parser.parse_args(argv)
+
+    service = ConversionService(args.workers, args.max_pending)
+    service.warm_up()
+    server = ConversionServer((args.host, args.port), service, args.max_upload_size * 1024 * 1024, args.quiet)
+    print(f"Serving on http://{args.host}:{server.server_port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
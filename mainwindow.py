@@ -1,16 +1,30 @@
 import os
+import queue
 import shutil
-import sys
+import threading
 import tkinter as tk
 from datetime import datetime
-from tkinter import filedialog
-
-from PIL import Image, ImageTk
+from tkinter import filedialog, ttk
 
+from appicon import get_logo_icon
+from sheetreaders import SUPPORTED_EXTENSIONS
 from worksheetwindow import WorksheetWindow
+from xlsxfile import ConversionCancelled, get_schema_path
 
 
 class MainWindow:
+    # The conversion stages, with the message logged for each.
+    CONVERSION_STAGES = {
+        "open": "Opening workbook...",
+        "load": "Loading worksheet...",
+        "parse": "Parsing rows...",
+        "nest": "Building hierarchy...",
+        "validate": "Validating typology...",
+        "write": "Writing XML file...",
+    }
+    # How often, in milliseconds, the main window checks for progress from the conversion thread.
+    POLL_INTERVAL = 50
+
     def __init__(self, root):
         """
         Initializes the main window of the MQM Typology Converter application.
@@ -27,25 +41,12 @@ class MainWindow:
         # Set the title of the main window.
         self.root.title("MQM Typology Converter")
         # Set the size of the main window.
-        self.root.geometry("350x370")
+        self.root.geometry("350x410")
         # Set the main window to be non-resizable.
         self.root.resizable(False, False)
 
-        # Find the directory where the application's resources are stored.
-        bundle_dir = getattr(sys, '_MEIPASS', os.path.abspath(os.path.dirname(__file__)))
-
-        # Specify the path to the logo image file.
-        image_path = os.path.join(bundle_dir, "mqm_logo.png")
-
-        # Open the logo image and resize it to fit the application.
-        png_image = Image.open(image_path)
-        png_image = png_image.resize((32, 32))
-
-        # Convert the image to a format that Tkinter can use.
-        icon = ImageTk.PhotoImage(png_image)
-
         # Set the window's icon to be the application's logo.
-        root.iconphoto(False, icon)
+        root.iconphoto(False, get_logo_icon())
 
         # Create a menu bar for the main window.
         menu = tk.Menu(root)
@@ -99,16 +100,28 @@ class MainWindow:
         self.target_error_label.grid(row=6, column=0, columnspan=3, pady=(0, 5))
 
         # Create a 'Convert' button that triggers the conversion process.
-        convert_button = tk.Button(root, text="Convert", command=self.convert, width=10)
-        convert_button.grid(row=7, column=0, columnspan=3, pady=5)
+        self.convert_button = tk.Button(root, text="Convert", command=self.convert, width=10)
+        self.convert_button.grid(row=7, column=0, pady=5)
+        # Create a 'Cancel' button that stops a running conversion.
+        self.cancel_button = tk.Button(root, text="Cancel", command=self.cancel_conversion, width=10,
+                                       state=tk.DISABLED)
+        self.cancel_button.grid(row=7, column=2, pady=5)
+
+        # Create a progress bar that advances as the conversion goes through its stages.
+        self.progress_bar = ttk.Progressbar(root, length=330, maximum=len(self.CONVERSION_STAGES))
+        self.progress_bar.grid(row=8, column=0, columnspan=3, pady=(0, 5))
 
         # Create a text box for displaying messages to the user.
         self.message_textbox = tk.Text(root, wrap=tk.WORD, height=6, width=40, state=tk.DISABLED)
-        self.message_textbox.grid(row=8, column=0, columnspan=3)
+        self.message_textbox.grid(row=9, column=0, columnspan=3)
 
         # Create a label for displaying the application's version number.
         version_label = tk.Label(root, text="v1.1.0.0")
-        version_label.grid(row=9, column=2, sticky="e")
+        version_label.grid(row=10, column=2, sticky="e")
+
+        # The running conversion's cancel flag and the queue its thread reports progress through.
+        self.cancel_event = None
+        self.progress_queue = None
         # Validate the source and target input fields when the user types in them.
         self.validate_source_input(None)
         self.validate_target_input(None)
@@ -131,7 +144,7 @@ class MainWindow:
         # Get the file path from the source input field.
         input_file = self.source_path_input.get()
         # Validate the file path and display any error message.
-        source_error = self.validate_file(input_file, ".xlsx", True)
+        source_error = self.validate_file(input_file, SUPPORTED_EXTENSIONS, True)
         # Update the error label with the error message.
         self.source_error_label.config(text=source_error)
 
@@ -159,7 +172,7 @@ class MainWindow:
 
             Args:
                 file_path (str): The path of the file to be validated.
-                file_extension (str): The expected file extension.
+                file_extension (str or tuple): The expected file extension, or a tuple of accepted extensions.
                 check_for_existence (bool): Flag to indicate whether to check for file existence.
 
             Returns:
@@ -175,16 +188,21 @@ class MainWindow:
         # If any of these checks fail, return an error message indicating the requirement.
         if (not (os.path.exists(file_path) or not check_for_existence)
                 or not file_path.lower().endswith(file_extension)):
+            if isinstance(file_extension, tuple):
+                file_extension = ", ".join(file_extension[:-1]) + " or " + file_extension[-1]
             return f"must be a valid path to {file_extension.upper()} file"
         return ""
 
     def browse_source_path(self):
         """
-            Opens a file dialog to browse and select an Excel file (.xlsx) as the source path.
+            Opens a file dialog to browse and select a typology file (.xlsx, .ods, .csv or .tsv) as the source path.
             Updates the source path input field with the selected file path.
             Calls the validate_source_input method to validate the selected file path.
         """
-        source_path = filedialog.askopenfilename(filetypes=[("Excel Files", "*.xlsx")])
+        source_path = filedialog.askopenfilename(filetypes=[("Typology Files", "*.xlsx *.ods *.csv *.tsv"),
+                                                            ("Excel Files", "*.xlsx"),
+                                                            ("OpenDocument Spreadsheets", "*.ods"),
+                                                            ("CSV/TSV Files", "*.csv *.tsv")])
         if source_path:
             self.source_path_input.delete(0, tk.END)
             self.source_path_input.insert(0, source_path)
@@ -204,22 +222,19 @@ class MainWindow:
 
     def convert(self):
         """
-            Initiates the conversion process and displays the result in the message text box.
+            Asks the user for a worksheet and starts converting it in the background.
             
             If the source or target paths are invalid, displays an error message and returns.
             Otherwise, opens a new window to display the worksheet and waits for the user to close it.
-            After the user closes the window, displays the result of the conversion in the message text box.
+            The selected worksheet is then converted on a worker thread, so the window stays responsive.
         """
-        # Enable the message text box to display the result.
-        self.message_textbox.config(state=tk.NORMAL)
-
         # Get the error messages from the source and target input fields.
         source_error = self.source_error_label.cget("text")
         target_error = self.target_error_label.cget("text")
 
         # If there are any errors in the source or target path, display a message and stop the conversion.
         if source_error or target_error:
-            self.message_textbox.insert(tk.END, "Please provide paths first.\n", "red")
+            self.log_message("Please provide paths first.\n", "red")
             return
 
         # Get the file paths from the source and target input fields.
@@ -231,28 +246,128 @@ class MainWindow:
         # Disable the main window while the worksheet window is open.
         worksheet_root.grab_set()
         # Create a new WorksheetWindow object to display the worksheet and wait for the user to choose a sheet.
-        ww = WorksheetWindow(worksheet_root, input_file, output_file)
+        ww = WorksheetWindow(worksheet_root, input_file)
         # Wait for the user to close the worksheet window.
         self.root.wait_window(worksheet_root)
-    
-        # Retrieve the success status and any exception message from the worksheet operation.
-        success = ww.success
-        exception = ww.exception_str
 
         # If user doesn't select a sheet and closes the window, return.
-        if success is None:
+        if ww.selected_worksheet is None:
             return
-        elif success:
+
+        # Only one conversion can run at a time.
+        self.convert_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.progress_bar["value"] = 0
+
+        # Run the conversion on a worker thread and check on it periodically from the Tk event loop.
+        self.cancel_event = threading.Event()
+        self.progress_queue = queue.Queue()
+        thread = threading.Thread(target=self.run_conversion, daemon=True,
+                                  args=(ww.worksheet, ww.selected_worksheet, output_file))
+        thread.start()
+        self.root.after(self.POLL_INTERVAL, self.poll_conversion)
+
+    def run_conversion(self, worksheet, sheet_name, output_file):
+        """
+            Converts the worksheet to XML. Runs on the worker thread, so it never touches Tkinter widgets.
+            Progress and the final result are passed to the Tk event loop through the progress queue.
+        """
+        cancel_event = self.cancel_event
+        progress_queue = self.progress_queue
+        stages = []
+
+        def progress(stage):
+            # Stop the conversion at the next progress report once the user has cancelled.
+            if cancel_event.is_set():
+                raise ConversionCancelled()
+            # Report each stage once.
+            if not stages or stages[-1] != stage:
+                stages.append(stage)
+                progress_queue.put(("stage", stage))
+
+        def instrument(record):
+            # Pass each stage's timing record on to be logged.
+            progress_queue.put(("record", record))
+
+        result = worksheet.convert_to_xml(sheet_name, output_file, progress=progress, instrument=instrument)
+        progress_queue.put(("done", result))
+
+    def poll_conversion(self):
+        """
+            Shows the progress reported by the conversion thread and the result once it finishes.
+        """
+        try:
+            while True:
+                event, value = self.progress_queue.get_nowait()
+                if event == "stage":
+                    # Advance the progress bar by one stage and log the stage that started.
+                    self.progress_bar["value"] = min(self.progress_bar["value"] + 1, len(self.CONVERSION_STAGES))
+                    self.log_message(f"{self.CONVERSION_STAGES[value]}\n")
+                elif event == "record":
+                    # Log how long the stage took and how much work it did, so it ends up in the saved log.
+                    self.log_message(f"{self.format_stage_record(value)}\n")
+                else:
+                    self.finish_conversion(*value)
+                    return
+        except queue.Empty:
+            pass
+        self.root.after(self.POLL_INTERVAL, self.poll_conversion)
+
+    @staticmethod
+    def format_stage_record(record):
+        """
+            Formats a conversion stage record as a single log line.
+        """
+        parts = [f"{record['seconds']:.2f} s"]
+        if record["rows"]:
+            parts.append(f"{record['rows']} rows")
+        if record["elements"]:
+            parts.append(f"{record['elements']} elements")
+        if record["bytes_written"]:
+            parts.append(f"{record['bytes_written']} bytes written")
+        if record["peak_memory_delta"]:
+            parts.append(f"+{record['peak_memory_delta'] / (1024 * 1024):.1f} MB peak memory")
+        return f"  {record['stage']}: {', '.join(parts)}"
+
+    def finish_conversion(self, success, exception):
+        """
+            Displays the result of the conversion in the message text box and re-enables the 'Convert' button.
+        """
+        if success:
             # If the conversion was successful, display a success message.
-            self.message_textbox.insert(tk.END, "Conversion complete and validation successful!\n", "green")
+            self.progress_bar["value"] = len(self.CONVERSION_STAGES)
+            self.log_message("Conversion complete and validation successful!\n", "green")
+        elif self.cancel_event.is_set():
+            self.progress_bar["value"] = 0
+            self.log_message("Conversion cancelled.\n", "red")
         else:
             # If the conversion failed, display an error message.
-            self.message_textbox.insert(tk.END, f"Conversion failed: {exception}\n", "red")
+            self.log_message(f"Conversion failed: {exception}\n", "red")
+
+        self.convert_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+
+    def cancel_conversion(self):
+        """
+            Asks the running conversion to stop. It stops at its next progress report.
+        """
+        if self.cancel_event is not None and not self.cancel_event.is_set():
+            self.cancel_event.set()
+            self.cancel_button.config(state=tk.DISABLED)
+            self.log_message("Cancelling...\n")
 
-        # Disable the message text box to prevent further editing.
+    def log_message(self, message, tag=None):
+        """
+            Appends a message to the message text box, optionally highlighted with a color tag.
+        """
+        # Enable the message text box, add the message, then disable it to prevent editing.
+        self.message_textbox.config(state=tk.NORMAL)
+        if tag:
+            self.message_textbox.insert(tk.END, message, tag)
+        else:
+            self.message_textbox.insert(tk.END, message)
+        self.message_textbox.see(tk.END)
         self.message_textbox.config(state=tk.DISABLED)
-        # Release the main window to allow user interaction.
-        worksheet_root.grab_release()
 
     @staticmethod
     def save_topology_schema():
@@ -264,14 +379,8 @@ class MainWindow:
         if not output_file:
             return
 
-        # Find the directory where the application's resources are stored.
-        bundle_dir = getattr(sys, '_MEIPASS', os.path.abspath(os.path.dirname(__file__)))
-
-        # Specify the path to the schema file.
-        source_file = os.path.join(bundle_dir, "typologySchema.xsd")
-
         # Copy the schema file to the selected location.
-        shutil.copy(source_file, output_file)
+        shutil.copy(get_schema_path(), output_file)
 
     def export_to_txt(self):
         """
@@ -0,0 +1,127 @@
+import os
+import threading
+
+from xlsxfile import MQM_HEADER_SCAN_ROWS
+
+# Inspections are cached by absolute path, and reused while the file's modification time and size are unchanged.
+_inspection_cache = {}
+_inspection_cache_lock = threading.Lock()
+
+
+class SheetInfo:
+    """
+    What the leading rows of a sheet say about it.
+
+    - name: The sheet name.
+    - mqm_row: The 1-based sheet row of the "MQM" header, or None if there is none among the leading rows.
+    - header_row: The 1-based sheet row of the column headers, or None.
+    - columns: A dictionary mapping each expected column to its index, or to None when it is missing.
+    - dimensions: The (rows, columns) the sheet declares, or None when unknown.
+    """
+
+    __slots__ = ("name", "mqm_row", "header_row", "columns", "dimensions")
+
+    def __init__(self, name, mqm_row=None, header_row=None, columns=None, dimensions=None):
+        self.name = name
+        self.mqm_row = mqm_row
+        self.header_row = header_row
+        self.columns = columns or {}
+        self.dimensions = dimensions
+
+    @property
+    def missing_columns(self):
+        return [column for column, index in self.columns.items() if index is None]
+
+    @property
+    def is_typology(self):
+        # A sheet looks like a typology when it has an MQM header followed by all the expected columns.
+        return self.header_row is not None and not self.missing_columns
+
+    def describe(self):
+        """
+        Returns a one-line summary of the sheet.
+        """
+        if self.mqm_row is None:
+            summary = "no MQM header"
+        elif self.header_row is None:
+            summary = f"MQM header at row {self.mqm_row}, no column headers"
+        elif self.missing_columns:
+            summary = f"MQM header at row {self.mqm_row}, missing {', '.join(self.missing_columns)}"
+        else:
+            summary = f"MQM header at row {self.mqm_row}"
+        if self.dimensions is not None:
+            summary += f", {self.dimensions[0]} rows x {self.dimensions[1]} columns"
+        return summary
+
+
+def inspect_sheet(worksheet, sheet_name):
+    """
+    Inspects the leading rows of a sheet of an XlsxFile.
+
+    At most MQM_HEADER_SCAN_ROWS rows are read to find the MQM header, and as many again to find the column
+    headers after it, so the rest of the sheet is never decoded.
+    """
+    rows = worksheet.iter_sheet_rows(sheet_name, MQM_HEADER_SCAN_ROWS * 2)
+    info = SheetInfo(sheet_name, dimensions=worksheet.get_sheet_dimensions(sheet_name))
+    for index, row in enumerate(rows, start=1):
+        if info.mqm_row is None:
+            if index > MQM_HEADER_SCAN_ROWS:
+                break
+            if worksheet.find_mqm_row([row]) is not None:
+                info.mqm_row = index
+        elif any(cell is not None and cell != "" for cell in row):
+            # The first non-blank row after the MQM header holds the column headers, as in a conversion.
+            info.header_row = index
+            info.columns = worksheet.map_columns(row)
+            break
+    return info
+
+
+def inspect_workbook(worksheet, stop_event=None):
+    """
+    Inspects every sheet of an XlsxFile, or returns the cached inspection if the file hasn't changed.
+
+    Parameters:
+    - worksheet: The XlsxFile to inspect.
+    - stop_event: A threading.Event that stops the inspection between sheets when it is set.
+
+    Returns:
+    - A list of SheetInfo objects in sheet order, or None if the inspection was stopped.
+    """
+    cached = get_cached_inspection(worksheet.location)
+    if cached is not None:
+        return cached
+
+    # Take the signature before reading, so a save during the inspection makes the next one start over.
+    path = os.path.abspath(worksheet.location)
+    signature = get_signature(path)
+    infos = []
+    for sheet_name in worksheet.get_sheet_names():
+        if stop_event is not None and stop_event.is_set():
+            return None
+        infos.append(inspect_sheet(worksheet, sheet_name))
+    with _inspection_cache_lock:
+        _inspection_cache[path] = (signature, infos)
+    return infos
+
+
+def get_cached_inspection(location):
+    """
+    Returns the cached inspection of a file if it is still up to date, otherwise None.
+    """
+    path = os.path.abspath(location)
+    try:
+        signature = get_signature(path)
+    except OSError:
+        return None
+    with _inspection_cache_lock:
+        cached = _inspection_cache.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    return None
+
+
+def get_signature(path):
+    # Return the modification time and size of a file.
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
@@ -0,0 +1,186 @@
+import csv
+import io
+import itertools
+import os
+
+# The readers behind XlsxFile. Each one exposes the sheet names of an input file, streams the rows of a
+# sheet as tuples of cell values, with None for empty cells, and reports a sheet's dimensions when they are
+# known without reading it. The MQM header detection and column mapping in XlsxFile work the same for
+# every format.
+#
+# pandas is imported inside the readers that use it, so that importing this module stays cheap.
+
+# The input file extensions that can be converted.
+SUPPORTED_EXTENSIONS = (".xlsx", ".ods", ".csv", ".tsv")
+
+
+class BufferReader(io.RawIOBase):
+    """
+    A seekable binary file that reads straight from a buffer such as a bytearray or memoryview,
+    so the content is never copied as a whole.
+    """
+
+    def __init__(self, data):
+        self.view = memoryview(data).cast("B")
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunk = self.view[self.position:self.position + len(buffer)]
+        buffer[:len(chunk)] = chunk
+        self.position += len(chunk)
+        return len(chunk)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += len(self.view)
+        self.position = max(0, offset)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+
+def is_path(location):
+    # Check whether 'location' is a filesystem path rather than in-memory content or a file object.
+    return isinstance(location, (str, os.PathLike))
+
+
+def open_source(data):
+    """
+    Returns a seekable binary file object over in-memory workbook content.
+
+    Parameters:
+    - data: bytes, a bytearray, a memoryview or a binary file-like object.
+    """
+    if isinstance(data, bytes):
+        # BytesIO shares the memory of a bytes object until it is written to.
+        return io.BytesIO(data)
+    if isinstance(data, (bytearray, memoryview)):
+        return BufferReader(data)
+    if data.seekable():
+        return data
+    # Workbooks are zip files, which can only be read from a seekable file.
+    return io.BytesIO(data.read())
+
+
+class XlsxReader:
+    """
+    Reads XLSX workbooks through pandas and openpyxl's read-only workbook.
+
+    'location' can be a path, or in-memory content as accepted by open_source.
+    """
+
+    def __init__(self, location):
+        import pandas as pd
+        self.xlsx_file = pd.ExcelFile(location if is_path(location) else open_source(location))
+
+    @property
+    def sheet_names(self):
+        return self.xlsx_file.sheet_names
+
+    def iter_rows(self, sheet_name, max_rows=None):
+        # Stream the rows of the sheet from the read-only workbook that pandas already opened.
+        # The workbook's shared strings are parsed once when it is opened and reused for every sheet.
+        return self.xlsx_file.book[sheet_name].iter_rows(max_row=max_rows, values_only=True)
+
+    def get_dimensions(self, sheet_name):
+        # Return the (rows, columns) the sheet declares for itself, without reading its rows.
+        # Some writers leave the declaration out, and then None is returned.
+        sheet = self.xlsx_file.book[sheet_name]
+        if sheet.max_row is None or sheet.max_column is None:
+            return None
+        return sheet.max_row, sheet.max_column
+
+    def close(self):
+        self.xlsx_file.close()
+
+
+class OdsReader:
+    """
+    Reads OpenDocument spreadsheets through pandas and odfpy.
+    """
+
+    def __init__(self, location):
+        import pandas as pd
+        self.ods_file = pd.ExcelFile(location, engine="odf")
+
+    @property
+    def sheet_names(self):
+        return self.ods_file.sheet_names
+
+    def iter_rows(self, sheet_name, max_rows=None):
+        # odfpy has no streaming mode, so the sheet is read as a whole and its rows are handed out one by one.
+        df = self.ods_file.parse(sheet_name, header=None, nrows=max_rows, dtype=object)
+        df = df.astype(object).where(df.notna(), None)
+        return df.itertuples(index=False, name=None)
+
+    def get_dimensions(self, sheet_name):
+        # The size of a sheet is only known once it is read in full.
+        return None
+
+    def close(self):
+        self.ods_file.close()
+
+
+class CsvReader:
+    """
+    Reads CSV and TSV files line by line with the csv module.
+
+    A text file holds a single sheet, named after the file.
+    """
+
+    def __init__(self, location, delimiter=None):
+        self.location = location
+        self.delimiter = delimiter
+        self.sheet_names = [os.path.splitext(os.path.basename(location))[0]]
+
+    def iter_rows(self, sheet_name, max_rows=None):
+        if sheet_name not in self.sheet_names:
+            raise KeyError(f"Worksheet named '{sheet_name}' not found")
+        return itertools.islice(self.read_rows(), max_rows)
+
+    def read_rows(self):
+        # 'utf-8-sig' drops the byte order mark that spreadsheet applications write at the start of CSV exports.
+        with open(self.location, newline="", encoding="utf-8-sig") as file:
+            delimiter = self.delimiter
+            if delimiter is None:
+                # Detect ';' separated exports from the first lines, falling back to commas.
+                try:
+                    delimiter = csv.Sniffer().sniff(file.read(64 * 1024), delimiters=",;\t").delimiter
+                except csv.Error:
+                    delimiter = ","
+                file.seek(0)
+            for row in csv.reader(file, delimiter=delimiter):
+                yield tuple(cell if cell != "" else None for cell in row)
+
+    def get_dimensions(self, sheet_name):
+        # The number of lines is only known once the file is read in full.
+        return None
+
+    def close(self):
+        pass
+
+
+def get_reader(location):
+    """
+    Returns a reader for the input file, chosen by its extension. Unknown extensions, and content that is
+    passed in memory instead of as a path, are read as XLSX.
+    """
+    if not is_path(location):
+        return XlsxReader(location)
+    extension = os.path.splitext(location)[1].lower()
+    if extension == ".csv":
+        return CsvReader(location)
+    if extension == ".tsv":
+        return CsvReader(location, "\t")
+    if extension == ".ods":
+        return OdsReader(location)
+    return XlsxReader(location)
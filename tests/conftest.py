@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The repository root, which holds the application modules.
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
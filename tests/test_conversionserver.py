@@ -0,0 +1,35 @@
+import json
+import threading
+import urllib.request
+
+from openpyxl import Workbook
+
+from conversionserver import ConversionServer, ConversionService
+
+
+def test_successful_conversions_return_their_stage_records(tmp_path):
+    xlsx_file = tmp_path / "typology.xlsx"
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Typology"
+    sheet.append(["MQM Typology"])
+    sheet.append(["Name", "Type ID", "Parent", "Type PID", "Description", "Examples", "Notes"])
+    sheet.append(["Accuracy", "accuracy", None, "1", "Target doesn't match the source", None, None])
+    workbook.save(xlsx_file)
+
+    service = ConversionService(workers=1)
+    server = ConversionServer(("127.0.0.1", 0), service, 1024 * 1024, quiet=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        request = urllib.request.Request(f"http://127.0.0.1:{server.server_port}/convert?sheet=Typology",
+                                         data=xlsx_file.read_bytes())
+        with urllib.request.urlopen(request) as response:
+            body = response.read()
+            stages = json.loads(response.headers["X-Conversion-Stages"])
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.shutdown()
+
+    assert body.startswith(b"<?xml")
+    assert [record["stage"] for record in stages] == ["open", "load", "parse", "nest", "validate", "write"]
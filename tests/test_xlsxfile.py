@@ -0,0 +1,169 @@
+import csv
+import io
+
+import pytest
+
+from typology import Typology
+from xlsxfile import MAX_PARSE_DEPTH, XlsxFile
+
+HEADER = ["Name", "Type ID", "Parent", "Type PID", "Description", "Examples", "Notes"]
+
+
+def write_csv(path, rows):
+    # Write a CSV typology with the "MQM" banner, the header row and the given rows.
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(["MQM"])
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+
+
+def hostile_rows():
+    # Rows whose texts need escaping, or that XML allows but are easy to mangle: quotes, markup characters,
+    # tabs, carriage returns, characters outside the BMP and Unicode noncharacters.
+    return [
+        ['A & "B" <c> \'d\'', "a", "", "1", "line1\nline2 & <x> ]]> \ttab", "\"q\" 'q'", "é € 😀"],
+        ["Tab\tname\rcr", "b", "a", "2", "cr\rhere", "﷐ \U0001ffff", ""],
+        ["c", "c+", "b", " 3 ", "", "", "x>y"],
+        ["d ", "d", "", "4", "&amp; &#13;", "", "\U0010fffd"],
+    ]
+
+
+def test_streamed_and_tree_outputs_are_identical(tmp_path):
+    csv_file = tmp_path / "hostile.csv"
+    write_csv(csv_file, hostile_rows())
+
+    success, message, tree_xml = XlsxFile(str(csv_file)).convert_to_bytes("hostile")
+    assert success, message
+    success, message, streamed_xml = XlsxFile(str(csv_file)).convert_to_bytes("hostile", stream=True)
+    assert success, message
+
+    assert streamed_xml == tree_xml
+
+
+def test_characters_xml_does_not_allow_are_refused(tmp_path):
+    csv_file = tmp_path / "invalid.csv"
+    write_csv(csv_file, [["Bad ￾ name", "a", "", "1", "", "", ""]])
+
+    for stream in (False, True):
+        xml_file = tmp_path / "invalid.xml"
+        success, message = XlsxFile(str(csv_file)).convert_to_xml("invalid", str(xml_file), stream=stream)
+
+        assert not success
+        assert message.startswith("All strings must be XML compatible")
+        assert not xml_file.exists()
+
+
+class WriteOnlyStream(io.RawIOBase):
+    # A stream that can only be written to, like a socket or a pipe.
+    def __init__(self):
+        self.written = b""
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.written += bytes(data)
+        return len(data)
+
+
+def test_unseekable_output_is_refused_before_writing_when_validating(tmp_path):
+    csv_file = tmp_path / "hostile.csv"
+    write_csv(csv_file, hostile_rows())
+
+    output = WriteOnlyStream()
+    success, message = XlsxFile(str(csv_file)).convert_to_stream("hostile", output, stream=True)
+
+    assert not success
+    assert message == "The output must be readable and seekable to validate the XML written to it"
+    assert output.written == b""
+
+    success, message = XlsxFile(str(csv_file)).convert_to_stream("hostile", output)
+    assert success, message
+    assert output.written.startswith(b"<?xml")
+
+
+def test_sheets_whose_file_names_clash_are_numbered():
+    file_names = XlsxFile.get_sheet_file_names(["A B", "Typology", "A/B", "A_B"])
+
+    assert file_names == {"A B": "A_B_1.xml", "Typology": "Typology.xml", "A/B": "A_B_3.xml", "A_B": "A_B_4.xml"}
+
+
+def test_sheets_whose_numbered_file_names_still_clash_are_refused():
+    with pytest.raises(ValueError, match="A_B_1.xml"):
+        XlsxFile.get_sheet_file_names(["A B", "A_B", "A_B_1"])
+
+
+def convert_csv(tmp_path, rows):
+    # Convert a CSV typology with the given rows, which start on sheet row 3, and return success and the message.
+    csv_file = tmp_path / "typology.csv"
+    write_csv(csv_file, rows)
+    success, message, _ = XlsxFile(str(csv_file)).convert_to_bytes("typology")
+    return success, message
+
+
+def test_every_row_problem_is_reported_with_its_sheet_row(tmp_path):
+    success, message = convert_csv(tmp_path, [
+        ["", "a", "", "1", "", "", ""],
+        ["B", "", "", "2", "", "", ""],
+        ["C", "c", "", "", "", "", ""],
+        ["D", "d_1", "", "4", "", "", ""],
+        ["E", "e", "", "5", "", "", ""],
+        [],
+        ["E again", "e", "a", "6", "", "", ""],
+        ["E once more", "e", "", "7", "", "", ""],
+        ["F", "f", "missing", "8", "", "", ""],
+        ["G", "g", "missing", "9", "", "", ""],
+    ])
+
+    assert not success
+    assert message.splitlines() == [
+        "An error cannot have a blank name. Row: 3",
+        "An error cannot have a blank id. Error name: B, Row: 4",
+        "An error cannot have a blank PID. Id: c, Row: 5",
+        "Id d_1 may only contain letters, digits, symbols and '-'. Row: 6",
+        "Duplicate id e. Rows: 7, 9, 10",
+        "Parent missing does not exist as an id. Rows: 11, 12",
+    ]
+
+
+def test_ids_with_symbols_are_allowed(tmp_path):
+    success, message = convert_csv(tmp_path, [["A", "a+b", "", "1", "", "", ""], ["B", "é-2", "a+b", "2", "", "", ""]])
+
+    assert success, message
+
+
+def test_parent_cycles_are_reported_with_their_sheet_rows(tmp_path):
+    success, message = convert_csv(tmp_path, [
+        ["A", "a", "", "1", "", "", ""],
+        ["Self", "s", "s", "2", "", "", ""],
+        ["X", "x", "z", "3", "", "", ""],
+        ["Y", "y", "x", "4", "", "", ""],
+        ["Z", "z", "y", "5", "", "", ""],
+        ["Under the cycle", "w", "z", "6", "", "", ""],
+    ])
+
+    assert not success
+    assert message.splitlines() == [
+        "Parent cycle between ids s. Rows: 4",
+        "Parent cycle between ids x, z, y. Rows: 5, 7, 6",
+    ]
+
+
+def test_typologies_deeper_than_the_xml_can_be_read_back_are_refused(tmp_path):
+    rows = [[f"Level {depth}", f"level-{depth}", f"level-{depth - 1}" if depth else "", "1", "", "", ""]
+            for depth in range(MAX_PARSE_DEPTH + 1)]
+
+    success, message = convert_csv(tmp_path, rows)
+
+    assert not success
+    assert message == (f"Error type level-{MAX_PARSE_DEPTH} is nested {MAX_PARSE_DEPTH + 1} levels deep, but typology "
+                       f"XML can't be read back with more than {MAX_PARSE_DEPTH} levels. Row: {MAX_PARSE_DEPTH + 3}")
+
+    # One level less can be written and loaded back.
+    csv_file = tmp_path / "deepest.csv"
+    xml_file = tmp_path / "deepest.xml"
+    write_csv(csv_file, rows[:-1])
+    success, message = XlsxFile(str(csv_file)).convert_to_xml("deepest", str(xml_file), stream=True)
+    assert success, message
+    assert len(Typology.from_xml(str(xml_file)).error_types) == MAX_PARSE_DEPTH
@@ -0,0 +1,66 @@
+from lxml import etree
+from openpyxl import load_workbook
+
+from xlsxfile import XlsxFile
+from xmltoxlsx import convert_xml_to_xlsx, iter_typology_rows, verify_round_trip
+
+
+def add_error_type(parent, name, row_id, pid, description="", notes="", examples=""):
+    # Add an errorType element laid out as XlsxFile writes it, one level below 'parent'.
+    level = 0 if parent.tag == "typology" else int(parent.get("level")) + 1
+    element = etree.SubElement(parent, "errorType", name=name, id=row_id, PID=pid, level=str(level))
+    for tag, text in (("description", description), ("notes", notes), ("examples", examples)):
+        etree.SubElement(element, tag).text = text
+    return element
+
+
+def write_typology(path):
+    # Write a typology with multi-line texts, empty fields, text that looks like formulas and a deep branch.
+    typology = etree.Element("typology", edition="MQM2021")
+    accuracy = add_error_type(typology, "Accuracy", "accuracy", "1", "Target doesn't match the source<br/>"
+                              "Second line<br/><br/>After a blank line", "", "e.g. <br/> & \"quotes\"")
+    add_error_type(accuracy, "=Total", "total", "007", "=A1+1", "=SUM(B2:B9)", "")
+    add_error_type(accuracy, "Mistranslation", "mistranslation", "1.2", "", "", "")
+    parent = add_error_type(typology, "Fluency", "fluency", "2", "Résumé – 😀")
+    for depth in range(1, 60):
+        parent = add_error_type(parent, f"Level {depth}", f"level-{depth}", f"2.{depth}", f"Line {depth}<br/>next")
+    XlsxFile.write_xml(typology, str(path))
+
+
+def test_round_trip_is_lossless(tmp_path):
+    xml_file = tmp_path / "typology.xml"
+    write_typology(xml_file)
+
+    success, message = verify_round_trip(str(xml_file))
+
+    assert success, message
+
+
+def test_round_trip_rows(tmp_path):
+    xml_file = tmp_path / "typology.xml"
+    write_typology(xml_file)
+
+    rows = list(iter_typology_rows(str(xml_file)))
+
+    assert len(rows) == 63
+    assert rows[0] == ["Accuracy", "accuracy", None, "1",
+                       "Target doesn't match the source\nSecond line\n\nAfter a blank line",
+                       "e.g. \n & \"quotes\"", ""]
+    assert rows[1] == ["=Total", "total", "accuracy", "007", "=A1+1", "", "=SUM(B2:B9)"]
+    assert rows[-1][:3] == ["Level 59", "level-59", "level-58"]
+
+
+def test_text_that_looks_like_a_formula_is_written_as_text(tmp_path):
+    xml_file = tmp_path / "typology.xml"
+    xlsx_file = tmp_path / "typology.xlsx"
+    write_typology(xml_file)
+
+    success, message = convert_xml_to_xlsx(str(xml_file), str(xlsx_file))
+
+    assert success, message
+    sheet = load_workbook(xlsx_file)["Typology"]
+    name_cell, _, _, pid_cell, description_cell, _, notes_cell = sheet[4]
+    assert (name_cell.value, name_cell.data_type) == ("=Total", "s")
+    assert (description_cell.value, description_cell.data_type) == ("=A1+1", "s")
+    assert (notes_cell.value, notes_cell.data_type) == ("=SUM(B2:B9)", "s")
+    assert pid_cell.value == "007"
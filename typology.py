@@ -0,0 +1,179 @@
+from xlsxfile import XlsxFile
+
+
+class ErrorType:
+    """
+    An error type in a loaded typology.
+
+    'enter' is the error type's position in the depth-first order of the typology and 'exit' is the position just
+    after its last descendant, so the descendants of an error type are exactly the error types with an 'enter'
+    between its own 'enter' and 'exit'.
+    """
+
+    __slots__ = ("id", "pid", "name", "level", "description", "examples", "notes", "parent", "children",
+                 "enter", "exit")
+
+    def __init__(self, type_id, pid, name, level, description="", examples="", notes="", parent=None):
+        self.id = type_id
+        self.pid = pid
+        self.name = name
+        self.level = level
+        self.description = description
+        self.examples = examples
+        self.notes = notes
+        self.parent = parent
+        self.children = []
+        self.enter = 0
+        self.exit = 0
+
+    def __repr__(self):
+        return f"ErrorType({self.id!r}, level={self.level})"
+
+
+class Typology:
+    """
+    A typology loaded into memory with an id index, a PID index and precomputed depth-first intervals.
+
+    Ancestor checks are constant time, the descendants of an error type are a slice of the depth-first order,
+    and the path to the root is as long as the error type's level.
+    """
+
+    def __init__(self, error_types):
+        """
+        Parameters:
+        - error_types: ErrorType objects in depth-first document order, with 'parent' and 'level' set.
+        """
+        self.error_types = error_types
+        self.roots = []
+        self.by_id = {}
+        self.by_pid = {}
+        for position, error_type in enumerate(error_types):
+            error_type.enter = position
+            self.by_id.setdefault(error_type.id, error_type)
+            self.by_pid.setdefault(error_type.pid, error_type)
+            if error_type.parent is None:
+                self.roots.append(error_type)
+            else:
+                error_type.parent.children.append(error_type)
+
+        # Children come after their parents, so walking backwards sees every subtree before its root.
+        for error_type in reversed(error_types):
+            error_type.exit = error_type.enter + 1 + sum(child.exit - child.enter for child in error_type.children)
+
+    def __len__(self):
+        return len(self.error_types)
+
+    def __iter__(self):
+        return iter(self.error_types)
+
+    def __contains__(self, type_id):
+        return type_id in self.by_id
+
+    @classmethod
+    def from_xml(cls, xml_file):
+        """
+        Loads a typology from a typology XML file.
+        """
+        from lxml import etree
+
+        error_types = []
+        # 'open_types' holds the errorType elements that are still open, innermost last.
+        open_types = []
+        for event, element in etree.iterparse(xml_file, events=("start", "end"), huge_tree=True):
+            tag = element.tag
+            if tag == "errorType":
+                if event == "start":
+                    parent = open_types[-1] if open_types else None
+                    error_type = ErrorType(element.get("id"), element.get("PID"), element.get("name"),
+                                           len(open_types), parent=parent)
+                    error_types.append(error_type)
+                    open_types.append(error_type)
+                else:
+                    open_types.pop()
+                    # Free the finished element and the siblings before it.
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del element.getparent()[0]
+            elif event == "end" and tag in ("description", "examples", "notes") and open_types:
+                setattr(open_types[-1], tag, element.text or "")
+        return cls(error_types)
+
+    @classmethod
+    def from_worksheet(cls, location, sheet_name):
+        """
+        Loads a typology directly from a workbook sheet, without writing XML.
+
+        Raises:
+        - ValueError: If the sheet can't be converted.
+        """
+        worksheet = XlsxFile(location)
+        try:
+            success, message, order = worksheet.build_typology(sheet_name)
+        except Exception as e:
+            success, message = False, str(e)
+        finally:
+            worksheet.reload()
+        if not success:
+            raise ValueError(message)
+
+        error_types = []
+        # 'ancestors' holds the open error type at each depth.
+        ancestors = []
+        for row_id, depth in order:
+            del ancestors[depth:]
+            element = worksheet.issue_element_map[row_id]
+            description, notes, examples = (child.text for child in element)
+            error_type = ErrorType(row_id, element.get("PID"), element.get("name"), depth, description, examples,
+                                   notes, ancestors[-1] if ancestors else None)
+            error_types.append(error_type)
+            ancestors.append(error_type)
+        return cls(error_types)
+
+    def get(self, type_id):
+        """
+        Returns the error type with the given id, or None.
+        """
+        return self.by_id.get(type_id)
+
+    def get_by_pid(self, pid):
+        """
+        Returns the error type with the given PID, or None.
+        """
+        return self.by_pid.get(pid)
+
+    def resolve(self, error_type):
+        # Accept either an ErrorType or an id.
+        return self.by_id[error_type] if isinstance(error_type, str) else error_type
+
+    def is_ancestor(self, ancestor, descendant):
+        """
+        Returns True if 'ancestor' is a proper ancestor of 'descendant'. Either can be an ErrorType or an id.
+        """
+        ancestor = self.resolve(ancestor)
+        descendant = self.resolve(descendant)
+        return ancestor.enter < descendant.enter < ancestor.exit
+
+    def descendants(self, error_type):
+        """
+        Returns all the descendants of an error type in depth-first order.
+        """
+        error_type = self.resolve(error_type)
+        return self.error_types[error_type.enter + 1:error_type.exit]
+
+    def count_descendants(self, error_type):
+        """
+        Returns the number of descendants of an error type.
+        """
+        error_type = self.resolve(error_type)
+        return error_type.exit - error_type.enter - 1
+
+    def path_to_root(self, error_type):
+        """
+        Returns the error type followed by its ancestors, ending with its top-level error type.
+        """
+        error_type = self.resolve(error_type)
+        path = []
+        while error_type is not None:
+            path.append(error_type)
+            error_type = error_type.parent
+        return path
@@ -0,0 +1,166 @@
+import argparse
+import hashlib
+import json
+import sys
+
+from typology import Typology
+from xlsxfile import XlsxFile
+
+# The text fields compared between two versions of an error type, besides its name.
+TEXT_FIELDS = ("PID", "description", "notes", "examples")
+
+
+def get_field(error_type, field):
+    return error_type.pid if field == "PID" else getattr(error_type, field)
+
+
+def hash_subtrees(typology):
+    """
+    Returns a dictionary mapping each id to a hash of its error type's subtree: its id, name, PID, texts
+    and the ids and hashes of its children, in order. Equal hashes mean identical subtrees.
+    """
+    hashes = {}
+    # Children come after their parents, so walking backwards hashes every child before its parent.
+    for error_type in reversed(typology.error_types):
+        digest = hashlib.blake2b(digest_size=16)
+        for value in (error_type.id, error_type.name, error_type.pid, error_type.description,
+                      error_type.notes, error_type.examples):
+            digest.update((value or "").encode("utf-8"))
+            digest.update(b"\0")
+        for child in error_type.children:
+            digest.update(hashes[child.id])
+        hashes[error_type.id] = digest.digest()
+    return hashes
+
+
+def get_parent_id(error_type):
+    return None if error_type.parent is None else error_type.parent.id
+
+
+def iter_changed(typology, other, hashes, other_hashes):
+    """
+    Yields the error types of 'typology' whose subtree differs from the one with the same id in 'other'.
+    The descendants of an unchanged subtree are skipped without being visited.
+    """
+    error_types = typology.error_types
+    position = 0
+    while position < len(error_types):
+        error_type = error_types[position]
+        match = other.get(error_type.id)
+        if (match is not None and hashes[error_type.id] == other_hashes[error_type.id]
+                and get_parent_id(match) == get_parent_id(error_type)):
+            # Jump past the subtree, whose error types are all unchanged.
+            position = error_type.exit
+            continue
+        yield error_type
+        position += 1
+
+
+def diff_typologies(old, new):
+    """
+    Compares two versions of a typology by id.
+
+    Returns:
+    - A dictionary with lists of the 'added', 'removed', 'moved' (reparented), 'renamed' and 'changed'
+      (PID or texts) error types, ready to be written as JSON.
+    """
+    old_hashes = hash_subtrees(old)
+    new_hashes = hash_subtrees(new)
+    result = {"added": [], "removed": [], "moved": [], "renamed": [], "changed": []}
+
+    for error_type in iter_changed(new, old, new_hashes, old_hashes):
+        old_type = old.get(error_type.id)
+        if old_type is None:
+            result["added"].append({"id": error_type.id, "name": error_type.name,
+                                    "parent": get_parent_id(error_type)})
+            continue
+        if get_parent_id(old_type) != get_parent_id(error_type):
+            result["moved"].append({"id": error_type.id, "old_parent": get_parent_id(old_type),
+                                    "new_parent": get_parent_id(error_type)})
+        if old_type.name != error_type.name:
+            result["renamed"].append({"id": error_type.id, "old_name": old_type.name, "new_name": error_type.name})
+        fields = {field: {"old": get_field(old_type, field), "new": get_field(error_type, field)}
+                  for field in TEXT_FIELDS if get_field(old_type, field) != get_field(error_type, field)}
+        if fields:
+            result["changed"].append({"id": error_type.id, "fields": fields})
+
+    for error_type in iter_changed(old, new, old_hashes, new_hashes):
+        if error_type.id not in new:
+            result["removed"].append({"id": error_type.id, "name": error_type.name,
+                                      "parent": get_parent_id(error_type)})
+    return result
+
+
+def format_diff(result):
+    """
+    Formats the result of diff_typologies as human-readable lines.
+    """
+    lines = []
+    for entry in result["added"]:
+        under = f" under {entry['parent']}" if entry["parent"] else " at the top level"
+        lines.append(f"Added    {entry['id']} \"{entry['name']}\"{under}")
+    for entry in result["removed"]:
+        lines.append(f"Removed  {entry['id']} \"{entry['name']}\"")
+    for entry in result["moved"]:
+        lines.append(f"Moved    {entry['id']} from {entry['old_parent'] or 'the top level'} "
+                     f"to {entry['new_parent'] or 'the top level'}")
+    for entry in result["renamed"]:
+        lines.append(f"Renamed  {entry['id']} \"{entry['old_name']}\" -> \"{entry['new_name']}\"")
+    for entry in result["changed"]:
+        lines.append(f"Changed  {entry['id']} {', '.join(entry['fields'])}")
+
+    counts = ", ".join(f"{len(result[kind])} {kind}" for kind in result)
+    lines.append(counts if any(result.values()) else "No changes")
+    return "\n".join(lines)
+
+
+def load_typology(path, sheet_name=None):
+    """
+    Loads a typology from typology XML, or converts it from a sheet of a workbook or a CSV/TSV file.
+    When no sheet name is given, the first sheet with an "MQM" header is used.
+    """
+    if path.lower().endswith(".xml"):
+        return Typology.from_xml(path)
+    if sheet_name is None:
+        worksheet = XlsxFile(path)
+        sheet_names = worksheet.get_mqm_sheet_names()
+        worksheet.reload()
+        if not sheet_names:
+            raise ValueError(f"MQM not found in any sheet of {path}")
+        sheet_name = sheet_names[0]
+    return Typology.from_worksheet(path, sheet_name)
+
+
+def main(argv=None):
+    """
+    Compares two versions of a typology.
+
+    Returns:
+    - 0 if they are the same, 1 if they differ, and 2 if either can't be loaded.
+    """
+    parser = argparse.ArgumentParser(description="Show what changed between two versions of a typology.")
+    parser.add_argument("old", help="old version: typology XML, or an XLSX, ODS, CSV or TSV typology")
+    parser.add_argument("new", help="new version: typology XML, or an XLSX, ODS, CSV or TSV typology")
+    parser.add_argument("--old-sheet", help="worksheet of the old version (default: the first with an MQM header)")
+    parser.add_argument("--new-sheet", help="worksheet of the new version (default: the first with an MQM header)")
+    parser.add_argument("--json", action="store_true", help="print the changes as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        old = load_typology(args.old, args.old_sheet)
+        new = load_typology(args.new, args.new_sheet)
+    except Exception as e:
+        print(f"Couldn't load the typology: {e}", file=sys.stderr)
+        return 2
+
+    result = diff_typologies(old, new)
+    if args.json:
+        json.dump(result, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        print(format_diff(result))
+    return 1 if any(result.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+import argparse
+import mmap
+import struct
+import sys
+
+# A typology index is a packed binary file that can be memory-mapped and searched by id without parsing XML.
+#
+# Layout (all integers little-endian):
+# - Header: magic b"MQMI", format version, node count, and the offsets of the node table, the id index
+#   and the string table.
+# - Node table: one record per error type in breadth-first order, so the children of every node are
+#   contiguous. A record holds the (offset, length) of its id, PID and name in the string table, its level,
+#   the index of its parent (NO_PARENT for top-level error types), and the index and count of its children.
+# - Id index: the node indexes sorted by id, for binary search.
+# - String table: the UTF-8 bytes of every distinct string.
+MAGIC = b"MQMI"
+FORMAT_VERSION = 1
+NO_PARENT = 0xFFFFFFFF
+HEADER = struct.Struct("<4sHHIIII")
+NODE = struct.Struct("<10I")
+INDEX_ENTRY = struct.Struct("<I")
+
+
+def iter_order_nodes(order, issue_element_map):
+    """
+    Yields (id, PID, name, parent id) tuples from an XlsxFile conversion's depth-first order.
+    """
+    # 'ancestors' holds the id of the open error type at each depth.
+    ancestors = []
+    for row_id, depth in order:
+        del ancestors[depth:]
+        element = issue_element_map[row_id]
+        yield row_id, element.get("PID"), element.get("name"), ancestors[-1] if ancestors else None
+        ancestors.append(row_id)
+
+
+def iter_xml_nodes(xml_file):
+    """
+    Yields (id, PID, name, parent id) tuples from a typology XML file without loading the whole tree.
+    """
+    from xmltoxlsx import iter_typology_rows
+
+    for name, type_id, parent, pid, _, _, _ in iter_typology_rows(xml_file):
+        yield type_id, pid, name, parent
+
+
+def write_typology_index(nodes, index_file):
+    """
+    Writes a typology index.
+
+    Parameters:
+    - nodes: (id, PID, name, parent id) tuples in document order. Top-level error types have a parent id of None.
+    - index_file: The path of the index file to write.
+    """
+    info = {}
+    children = {}
+    for type_id, pid, name, parent in nodes:
+        info[type_id] = (pid, name)
+        children.setdefault(parent, []).append(type_id)
+
+    # Lay the nodes out breadth-first so that the children of each node are contiguous.
+    order = list(children.get(None, []))
+    parents = [NO_PARENT] * len(order)
+    levels = [0] * len(order)
+    child_ranges = []
+    for index, type_id in enumerate(order):
+        type_children = children.get(type_id, [])
+        child_ranges.append((len(order), len(type_children)))
+        order.extend(type_children)
+        parents.extend([index] * len(type_children))
+        levels.extend([levels[index] + 1] * len(type_children))
+
+    # Build the string table, storing each distinct string once.
+    strings = bytearray()
+    string_offsets = {}
+
+    def add_string(value):
+        if value not in string_offsets:
+            encoded = (value or "").encode("utf-8")
+            string_offsets[value] = (len(strings), len(encoded))
+            strings.extend(encoded)
+        return string_offsets[value]
+
+    node_table = bytearray(NODE.size * len(order))
+    id_bytes = []
+    for index, type_id in enumerate(order):
+        pid, name = info[type_id]
+        id_range = add_string(type_id)
+        first_child, child_count = child_ranges[index]
+        NODE.pack_into(node_table, index * NODE.size, *id_range, *add_string(pid), *add_string(name),
+                       levels[index], parents[index], first_child, child_count)
+        id_bytes.append(type_id.encode("utf-8"))
+
+    id_index = bytearray(INDEX_ENTRY.size * len(order))
+    for position, index in enumerate(sorted(range(len(order)), key=id_bytes.__getitem__)):
+        INDEX_ENTRY.pack_into(id_index, position * INDEX_ENTRY.size, index)
+
+    nodes_offset = HEADER.size
+    id_index_offset = nodes_offset + len(node_table)
+    strings_offset = id_index_offset + len(id_index)
+    with open(index_file, "wb") as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(order), nodes_offset, id_index_offset, strings_offset))
+        file.write(node_table)
+        file.write(id_index)
+        file.write(strings)
+
+
+class TypologyIndex:
+    """
+    A read-only, memory-mapped typology index.
+
+    Nodes are addressed by their position in the node table. Looking up an id is a binary search over the mapped
+    file, so opening an index costs the same regardless of the typology size.
+    """
+
+    def __init__(self, index_file):
+        self.file = open(index_file, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.node_count, self.nodes_offset, self.id_index_offset, self.strings_offset = \
+            HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{index_file} is not a typology index")
+
+    def __len__(self):
+        return self.node_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def get_string(self, offset, length):
+        start = self.strings_offset + offset
+        return self.data[start:start + length].decode("utf-8")
+
+    def get_id_bytes(self, index):
+        offset, length = struct.unpack_from("<2I", self.data, self.nodes_offset + index * NODE.size)
+        start = self.strings_offset + offset
+        return self.data[start:start + length]
+
+    def find(self, type_id):
+        """
+        Returns the node index of the error type with the given id, or None if there is none.
+        """
+        target = type_id.encode("utf-8")
+        low, high = 0, self.node_count
+        while low < high:
+            middle = (low + high) // 2
+            index = INDEX_ENTRY.unpack_from(self.data, self.id_index_offset + middle * INDEX_ENTRY.size)[0]
+            if self.get_id_bytes(index) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.node_count:
+            index = INDEX_ENTRY.unpack_from(self.data, self.id_index_offset + low * INDEX_ENTRY.size)[0]
+            if self.get_id_bytes(index) == target:
+                return index
+        return None
+
+    def get_node(self, index):
+        """
+        Returns the node at 'index' as a dictionary with its id, PID, name, level, parent index
+        (None for top-level error types) and the range of its children's node indexes.
+        """
+        (id_offset, id_length, pid_offset, pid_length, name_offset, name_length,
+         level, parent, first_child, child_count) = NODE.unpack_from(self.data, self.nodes_offset + index * NODE.size)
+        return {
+            "id": self.get_string(id_offset, id_length),
+            "PID": self.get_string(pid_offset, pid_length),
+            "name": self.get_string(name_offset, name_length),
+            "level": level,
+            "parent": None if parent == NO_PARENT else parent,
+            "children": range(first_child, first_child + child_count),
+        }
+
+    def get(self, type_id):
+        """
+        Returns the node with the given id, or None if there is none.
+        """
+        index = self.find(type_id)
+        return None if index is None else self.get_node(index)
+
+
+def main(argv=None):
+    """
+    Builds a typology index from a typology XML file.
+    """
+    parser = argparse.ArgumentParser(description="Build a memory-mappable id index from typology XML.")
+    parser.add_argument("xml_file", help="typology XML file to read")
+    parser.add_argument("index_file", help="index file to write")
+    args = parser.parse_args(argv)
+
+    write_typology_index(iter_xml_nodes(args.xml_file), args.index_file)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+import argparse
+import os
+import sys
+import time
+
+from xlsxfile import XlsxFile
+
+
+class TypologyWatcher:
+    """
+    Keeps a converted typology in memory and re-converts it incrementally when the workbook changes.
+
+    On each change the sheet's rows are re-read and compared with the typology by type id. Only the error types
+    whose content changed, or that were added or removed, are rebuilt, along with the child lists of the parents
+    whose children changed. The XML is then rewritten and revalidated.
+    """
+
+    def __init__(self, input_file, sheet_name, output_file):
+        self.input_file = input_file
+        self.sheet_name = sheet_name
+        self.output_file = output_file
+        self.worksheet = XlsxFile(input_file)
+        # When the in-memory typology can't be trusted, the next update is a full conversion.
+        self.needs_full_conversion = True
+
+    def update(self):
+        """
+        Brings the XML file up to date with the workbook.
+
+        Returns:
+        - A tuple of success, a message, and the number of error types that were rebuilt.
+        """
+        self.worksheet.reload()
+        if self.needs_full_conversion:
+            return self.convert()
+        try:
+            return self.update_incrementally()
+        except Exception as e:
+            # The typology may be partly rebuilt, so start over once the workbook is saved again.
+            self.needs_full_conversion = True
+            return False, str(e), 0
+
+    def update_incrementally(self):
+        # Rebuild the error types that changed since the last update. See update.
+        worksheet = self.worksheet
+        mqm_index = worksheet.find_mqm_and_prepare_df(self.sheet_name)
+        success, message, rows = worksheet.read_worksheet_rows(mqm_index)
+        if not success:
+            return success, message, 0
+        problems = worksheet.validate_rows(rows)
+        if problems:
+            return False, "\n".join(problems), 0
+
+        # Index the new rows by type id. The ids were checked to be unique.
+        new_rows = {}
+        new_id_map = {}
+        new_row_map = {}
+        for index, row in enumerate(rows, start=1):
+            row_id, parent = row[1], row[2]
+            new_rows[row_id] = row
+            new_id_map.setdefault(parent, []).append(row_id)
+            new_row_map[row_id] = worksheet.row_numbers[index]
+
+        # Check the new hierarchy before touching the tree. A parent cycle would have lxml append an element to
+        # its own descendant.
+        old_id_map = worksheet.issue_id_map
+        worksheet.issue_id_map = new_id_map
+        worksheet.issue_row_map = new_row_map
+        order = worksheet.order_error_types()
+        problems = worksheet.find_hierarchy_problems(order)
+        if problems:
+            # The maps no longer match the tree, so start over once the sheet is fixed.
+            self.needs_full_conversion = True
+            return False, "\n".join(problems), 0
+
+        element_map = worksheet.issue_element_map
+        rebuilt = 0
+        # Drop the error types that were removed from the sheet.
+        for row_id in [row_id for row_id in element_map if row_id not in new_rows]:
+            del element_map[row_id]
+            rebuilt += 1
+
+        # Create the added error types and update the changed ones in place.
+        for row_id, (name, _, _, pid, description, examples, notes) in new_rows.items():
+            element = element_map.get(row_id)
+            if element is None:
+                element_map[row_id] = worksheet.create_error_type_element(name, row_id, pid, description,
+                                                                          examples, notes)
+                rebuilt += 1
+                continue
+            description_element, notes_element, examples_element = element[:3]
+            if (element.get("name") != name or element.get("PID") != pid
+                    or description_element.text != description or notes_element.text != notes
+                    or examples_element.text != examples):
+                element.set("name", name)
+                element.set("PID", pid)
+                description_element.text = description
+                notes_element.text = notes
+                examples_element.text = examples
+                rebuilt += 1
+
+        # Rebuild the child lists of the parents whose children were added, removed, moved or reordered.
+        # Every child list that changed is emptied first, so the tree only ever holds links of the new hierarchy,
+        # which was checked to have no cycles. Otherwise swapping a parent and child would append an element
+        # to its own descendant.
+        changed_parents = []
+        for parent in old_id_map.keys() | new_id_map.keys():
+            if old_id_map.get(parent, []) == new_id_map.get(parent, []):
+                continue
+            parent_element = worksheet.typology_element if parent == "" else element_map.get(parent)
+            if parent_element is None:
+                # A parent that was removed along with its children.
+                continue
+            for child in parent_element.findall("errorType"):
+                parent_element.remove(child)
+            changed_parents.append((parent_element, new_id_map.get(parent, [])))
+        for parent_element, children in changed_parents:
+            for row_id in children:
+                parent_element.append(element_map[row_id])
+
+        # Fix the levels of the error types that moved to another depth.
+        for row_id, depth in order:
+            element = element_map[row_id]
+            if element.get("level") != str(depth):
+                element.set("level", str(depth))
+
+        success, message = worksheet.validate_element(worksheet.typology_element)
+        if not success:
+            self.needs_full_conversion = True
+            return success, message, rebuilt
+        worksheet.write_xml(worksheet.typology_element, self.output_file)
+        return True, "", rebuilt
+
+    def convert(self):
+        """
+        Converts the whole sheet and keeps the typology in memory for later updates.
+        """
+        success, message = self.worksheet.convert_to_xml(self.sheet_name, self.output_file)
+        self.needs_full_conversion = not success
+        return success, message, len(self.worksheet.issue_element_map)
+
+    def get_signature(self):
+        # Return the modification time and size of the workbook, or None while it is missing.
+        try:
+            stat = os.stat(self.input_file)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def watch(self, interval=0.5):
+        """
+        Converts the sheet, then polls the workbook and updates the XML every time it is saved.
+        """
+        signature = self.get_signature()
+        self.report(*self.timed_update())
+        while True:
+            time.sleep(interval)
+            current = self.get_signature()
+            if current is None or current == signature:
+                continue
+            # Wait until the file stops changing, so a save in progress isn't read.
+            time.sleep(interval)
+            if self.get_signature() != current:
+                continue
+            signature = current
+            self.report(*self.timed_update())
+
+    def timed_update(self):
+        start = time.perf_counter()
+        success, message, rebuilt = self.update()
+        return success, message, rebuilt, time.perf_counter() - start
+
+    def report(self, success, message, rebuilt, seconds):
+        if success:
+            print(f"Updated {self.output_file}: {rebuilt} error types rebuilt in {seconds:.2f} s", flush=True)
+        else:
+            print(f"Conversion failed: {message}", flush=True)
+
+
+def main(argv=None):
+    """
+    Watches a workbook and keeps the typology XML of one of its sheets up to date.
+    """
+    parser = argparse.ArgumentParser(description="Re-convert an MQM typology sheet every time the workbook is saved.")
+    parser.add_argument("input_file", help="XLSX workbook to watch")
+    parser.add_argument("output_file", help="typology XML file to keep up to date")
+    parser.add_argument("-s", "--sheet", required=True, dest="sheet_name", help="worksheet to convert")
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between checks for changes")
+    args = parser.parse_args(argv)
+
+    watcher = TypologyWatcher(args.input_file, args.sheet_name, args.output_file)
+    try:
+        watcher.watch(args.interval)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
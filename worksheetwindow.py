@@ -1,17 +1,19 @@
-import os
-import sys
+import queue
+import threading
 import tkinter as tk
 
-from PIL import Image, ImageTk
-
+from appicon import get_logo_icon
+from sheetinspector import get_cached_inspection, inspect_workbook
 from xlsxfile import XlsxFile
 
 
 class WorksheetWindow:
-    def __init__(self, root, input_file, output_file):
-        # Initialize variables for storing any exceptions and the success status.
-        self.exception_str = None
-        self.success = None
+    # How often, in milliseconds, the window checks whether the sheet inspection has finished.
+    POLL_INTERVAL = 50
+
+    def __init__(self, root, input_file):
+        # Initialize the variable for storing the selected worksheet name.
+        self.selected_worksheet = None
 
         # Set the root window and its properties.
         self.root = root
@@ -21,19 +23,10 @@ class WorksheetWindow:
         self.root.title("Worksheet Selection")  # Set the window title.
         self.root.geometry("450x500")  # Define the size of the window.
         self.root.resizable(False, False)  # Prevent resizing of the window.
-        self.output_file = output_file  # Store the output file path.
-
-        # Get the directory where the application's resources are stored.
-        bundle_dir = getattr(sys, '_MEIPASS', os.path.abspath(os.path.dirname(__file__)))
-        source_file = os.path.join(bundle_dir, "mqm_logo.png") # Path to the logo image.
+        self.root.protocol("WM_DELETE_WINDOW", self.close)  # Stop the sheet inspection when the window closes.
 
         # Set the application icon.
-        png_image = Image.open(source_file)
-        png_image = png_image.resize((32, 32))
-
-        # Convert the image to a format that Tkinter can use and set it as the window icon.
-        icon = ImageTk.PhotoImage(png_image)
-        root.iconphoto(False, icon)
+        root.iconphoto(False, get_logo_icon())
 
         # Load the input file into the XlsxFile class to handle Excel operations.
         self.worksheet = XlsxFile(input_file)
@@ -50,23 +43,122 @@ class WorksheetWindow:
         # Create a listbox to display the available worksheets in the input file.
         self.worksheet_listbox = tk.Listbox(self.canvas, selectmode=tk.SINGLE, height=20, width=71)
         self.worksheet_listbox.place(x=10, y=70)
-        # Populate the listbox with the names of the worksheets.
-        for worksheet_name in self.worksheet.get_sheet_names():
-            self.worksheet_listbox.insert(tk.END, worksheet_name)
 
         # Add a button for the user to select a worksheet from the list.
         select_button = tk.Button(self.canvas, text="Select Worksheet", height=2, width=20,
                                   command=self.select_worksheet)
         select_button.place(x=150, y=425) # Position the button on the canvas.
 
+        # Add a label for warnings about the selected worksheet.
+        self.status_label = tk.Label(self.canvas, text="", fg="red", background="white", wraplength=430)
+        self.status_label.place(x=10, y=472)
+
+        # 'sheet_infos' maps each sheet name to what the inspector found in its leading rows.
+        # 'confirmed_sheet' is a sheet the user chose again after being warned that it doesn't look like a typology.
+        self.sheet_names = []
+        self.sheet_infos = {}
+        self.confirmed_sheet = None
+        self.stop_event = threading.Event()
+        self.inspection_thread = None
+
+        # Show a cached inspection of an unchanged file straight away, without opening it.
+        infos = get_cached_inspection(input_file)
+        if infos is not None:
+            self.show_inspection(infos)
+            return
+
+        # Open the file and inspect its sheets in the background. Opening a large workbook parses its shared strings,
+        # which would otherwise freeze the window while it is built.
+        self.worksheet_listbox.insert(tk.END, "Reading the file...")
+        self.worksheet_listbox.itemconfig(0, foreground="gray")
+        self.inspection_queue = queue.Queue()
+        self.inspection_thread = threading.Thread(target=self.run_inspection, daemon=True)
+        self.inspection_thread.start()
+        self.root.after(self.POLL_INTERVAL, self.poll_inspection)
+
+    def run_inspection(self):
+        # Open the file, then inspect the leading rows of every sheet. Runs on a worker thread, so it never touches
+        # Tkinter widgets. The sheet names are passed on as soon as they are known, and the inspection once it's done.
+        try:
+            self.inspection_queue.put(("names", self.worksheet.get_sheet_names()))
+            self.inspection_queue.put(("inspection", inspect_workbook(self.worksheet, self.stop_event)))
+        except Exception as e:
+            self.inspection_queue.put(("error", str(e)))
+
+    def poll_inspection(self):
+        # Show what the worker thread has found so far, until the inspection has finished.
+        if self.stop_event.is_set():
+            return
+        try:
+            while True:
+                event, value = self.inspection_queue.get_nowait()
+                if event == "names":
+                    # List the sheets while their leading rows are inspected.
+                    self.sheet_names = value
+                    self.worksheet_listbox.delete(0, tk.END)
+                    for worksheet_name in self.sheet_names:
+                        self.worksheet_listbox.insert(tk.END, f"{worksheet_name}  (inspecting...)")
+                elif event == "inspection":
+                    if value is not None:
+                        self.show_inspection(value)
+                    return
+                else:
+                    # The sheets stay listed without details, and the conversion reports the problem.
+                    self.worksheet_listbox.delete(0, tk.END)
+                    for worksheet_name in self.sheet_names:
+                        self.worksheet_listbox.insert(tk.END, worksheet_name)
+                    if not self.sheet_names:
+                        self.status_label.config(text=f"Couldn't read the file: {value}")
+                    return
+        except queue.Empty:
+            pass
+        self.root.after(self.POLL_INTERVAL, self.poll_inspection)
+
+    def show_inspection(self, infos):
+        # List each sheet with a summary of its layout and preselect the first one that looks like a typology.
+        self.sheet_names = [info.name for info in infos]
+        self.sheet_infos = {info.name: info for info in infos}
+        self.worksheet_listbox.delete(0, tk.END)
+        for index, info in enumerate(infos):
+            self.worksheet_listbox.insert(tk.END, f"{info.name}  -  {info.describe()}")
+            if not info.is_typology:
+                self.worksheet_listbox.itemconfig(index, foreground="gray")
+
+        typology_indexes = [index for index, info in enumerate(infos) if info.is_typology]
+        if typology_indexes and not self.worksheet_listbox.curselection():
+            self.worksheet_listbox.selection_set(typology_indexes[0])
+            self.worksheet_listbox.activate(typology_indexes[0])
+            self.worksheet_listbox.see(typology_indexes[0])
+
+    def stop_inspection(self):
+        # Stop the inspection and wait for the sheet it is reading, so the conversion has the file to itself.
+        self.stop_event.set()
+        if self.inspection_thread is not None:
+            self.inspection_thread.join()
+
     def select_worksheet(self):
         # Get the selected index from the listbox.
         selected_index = self.worksheet_listbox.curselection()
-        if selected_index:
-            # Retrieve the name of the selected worksheet.
-            selected_worksheet = self.worksheet_listbox.get(selected_index)
-            # Convert the selected worksheet to XML and save it to the output file.
-            # 'success' will be True if the operation succeeded, and 'exception_str' will contain any error message.
-            self.success, self.exception_str = self.worksheet.convert_to_xml(selected_worksheet, self.output_file)
-            # Close the window once the selection is made and the conversion is complete.
+        # Nothing can be selected until the sheet names are known.
+        if selected_index and selected_index[0] < len(self.sheet_names):
+            # Retrieve the name of the selected worksheet. The main window converts it in the background.
+            worksheet_name = self.sheet_names[selected_index[0]]
+
+            # Warn once about a sheet that the inspection says can't be converted, instead of reading it in full.
+            info = self.sheet_infos.get(worksheet_name)
+            if info is not None and not info.is_typology and self.confirmed_sheet != worksheet_name:
+                self.confirmed_sheet = worksheet_name
+                self.status_label.config(text=f"{worksheet_name} doesn't look like a typology. "
+                                              "Select it again to convert it anyway.")
+                return
+
+            self.stop_inspection()
+            self.selected_worksheet = worksheet_name
+            # Close the window once the selection is made.
             self.root.destroy()
+
+    def close(self):
+        # Close the window without selecting a worksheet. The inspection stops by itself after the sheet it is reading,
+        # so the window doesn't wait for it, which could take as long as opening the file.
+        self.stop_event.set()
+        self.root.destroy()
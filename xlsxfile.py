@@ -1,213 +1,804 @@
+import collections
+import functools
+import io
 import os
+import re
 import sys
+import time
+import unicodedata
 
-import pandas as pd
-import xml.etree.ElementTree as et
-from lxml import etree
+from sheetreaders import get_reader, is_path
+
+try:
+    import resource
+except ImportError:
+    # The resource module is not available on Windows, so memory isn't included in stage records there.
+    resource = None
+
+# pandas and lxml are imported inside the methods that use them, so that importing this module
+# (and starting the GUI) does not pay for them before the first conversion.
+
+
+# The converter version. Cached conversions made by other versions are not reused.
+CONVERTER_VERSION = "1.1.0.0"
+
+
+# How many rows are processed between progress reports inside a stage.
+PROGRESS_INTERVAL = 1000
+
+# Ids made only of these characters match the schema's id pattern without checking character categories.
+SIMPLE_ID_PATTERN = re.compile(r"[A-Za-z0-9-]+")
+
+# How many levels of error types the written XML can have. libxml2 refuses to parse documents with more than
+# 2048 nested elements, even with huge_tree, and the typology element and the texts of an error type take two
+# of them. Deeper typologies are rejected, since neither this converter nor the readers of its XML could parse them.
+MAX_PARSE_DEPTH = 2046
+
+# The start and end of a typology XML file, as write_xml writes them around the error types.
+XML_HEADER = b"<?xml version='1.0' encoding='UTF-8'?>\n<typology edition=\"MQM2021\">"
+XML_FOOTER = b"\n</typology>"
+
+# How many leading rows are searched for the "MQM" header when picking out typology sheets.
+MQM_HEADER_SCAN_ROWS = 100
+
+
+class ConversionCancelled(Exception):
+    # Raised by a progress callback to stop a running conversion.
+    def __init__(self):
+        super().__init__("Conversion cancelled")
+
+
+def get_peak_memory():
+    # Return the peak resident memory of the process in bytes, or None if it can't be measured.
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def get_resource_path(file_name):
+    # Get the directory where the application's resources are stored.
+    bundle_dir = getattr(sys, '_MEIPASS', os.path.abspath(os.path.dirname(__file__)))
+    return os.path.join(bundle_dir, file_name)
+
+
+def get_schema_path():
+    return get_resource_path("typologySchema.xsd")
+
+
+def is_valid_id(row_id):
+    # Check an id against the schema's [\w-]+ pattern. In XML Schema, \w matches every character except
+    # punctuation, separators and control characters, so '_' is not allowed but symbols like '+' are.
+    if SIMPLE_ID_PATTERN.fullmatch(row_id):
+        return True
+    return all(char == "-" or unicodedata.category(char)[0] not in "PZC" for char in row_id)
+
+
+@functools.lru_cache(maxsize=None)
+def get_xsd_schema():
+    # Parse and compile the typology schema once per process.
+    from lxml import etree
+    return etree.XMLSchema(etree.parse(get_schema_path()))
+
+
+def serialize_error_types(rows, next_depth):
+    # Serialize a contiguous run of the depth-first order as indented XML, laid out exactly as write_xml writes it,
+    # without nesting the error types in a tree.
+    # 'rows' holds (name, id, PID, description, examples, notes, depth) tuples, and 'next_depth' is the depth of
+    # the error type after the run, or -1 after the last one. An error type whose children follow is left open,
+    # and the error types that end before the next one are closed.
+    # Each error type is built and serialized by lxml on its own, so it is checked and escaped as in a tree.
+    # Used by streamed conversions. Returns UTF-8 bytes.
+    from lxml import etree
+
+    parts = []
+    for index, (name, row_id, pid, description, examples, notes, depth) in enumerate(rows):
+        element = XlsxFile.create_error_type_element(name, row_id, pid, description, examples, notes)
+        element.set("level", str(depth))
+        # The typology element is level 0 of the indentation, so an error type at depth 0 is at level 1.
+        etree.indent(element, space="\t", level=depth + 1)
+        indent = b"\n" + b"\t" * (depth + 1)
+        data = etree.tostring(element, encoding="utf-8", xml_declaration=False)
+
+        following_depth = rows[index + 1][6] if index + 1 < len(rows) else next_depth
+        if following_depth > depth:
+            # Leave the element open for its children, which come next.
+            data = data[:-len(indent + b"</errorType>")]
+        parts.append(indent + data)
+        # Close the ancestors that have no more children. An ancestor at depth d is indented at level d + 1.
+        for level in range(depth, max(following_depth, 0), -1):
+            parts.append(b"\n" + b"\t" * level + b"</errorType>")
+    return b"".join(parts)
 
 
 class XlsxFile:
     def __init__(self, location):
         # Store the location of the Excel file and initialize variables.
         self.location = location
-        # 'df' will hold the data from the Excel file.
+        # 'df' will hold the data from the Excel file, and 'row_numbers' the sheet row of each of its rows.
         self.df = None
-        # Open the Excel file using pandas.
-        self.xlsx_file = pd.ExcelFile(location)
-        # Initialize dictionaries to map issues and their IDs.
+        self.row_numbers = []
+        # The input file is opened on first use, so cached conversions never open it.
+        self._reader = None
+        # Initialize dictionaries to map issues and their IDs, and issues to their sheet rows.
         self.issue_element_map = {}
         self.issue_id_map = {}
+        self.issue_row_map = {}
+        # 'issue_rows' maps each id to its normalized row when a streamed conversion writes the XML
+        # from the rows instead of building elements.
+        self.issue_rows = {}
+        # 'typology_element' holds the root of the last typology built in memory.
+        self.typology_element = None
+        # 'progress' is called with the name of the current stage while converting.
+        self.progress = None
+        # 'instrument' is called with a record of each stage once it ends. The records of the last
+        # conversion are also kept in 'stage_records'.
+        self.instrument = None
+        self.stage_records = []
+        self.current_stage = None
+
+    @property
+    def reader(self):
+        # Open the input file with the reader for its format (XLSX, ODS, CSV or TSV, see sheetreaders).
+        if self._reader is None:
+            self._reader = get_reader(self.location)
+        return self._reader
+
+    def reload(self):
+        # Close the input file so the next read picks up changes made on disk.
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
 
     def get_sheet_names(self):
-        # Return the names of all sheets in the Excel file.
-        return self.xlsx_file.sheet_names
-
-    def convert_to_xml(self, sheet_name, xml_file):
+        # Return the names of all sheets in the input file. CSV and TSV files have a single sheet.
+        return self.reader.sheet_names
+
+    def open_input_file(self):
+        # Open the input file as the "open" stage of a conversion and return its sheet names. Opening a workbook
+        # parses its shared strings, which can take as long as reading a sheet. A file that is already open is reused.
+        self.begin_stage("open")
+        sheet_names = self.get_sheet_names()
+        self.end_stage()
+        return sheet_names
+
+    def convert_to_xml(self, sheet_name, xml_file, stream=False, verify_file=False, cache=None, progress=None,
+                       instrument=None, profile_file=None, index_file=None):
+        # When 'stream' is True, the typology is written to disk straight from the sheet's rows, without
+        # building any elements, and the written file is then validated while it is parsed back.
+        # Otherwise the tree is validated in memory before writing, and 'verify_file' re-parses
+        # and validates the written file as well.
+        # When a ConversionCache is given, unchanged workbooks are copied from the cache instead of converted.
+        # 'progress' is called with "open", "load", "parse", "nest", "validate" and "write" as the conversion goes on,
+        # and periodically within a stage. It can raise ConversionCancelled to stop the conversion.
+        # 'instrument' receives a record for each stage, see end_stage. When 'profile_file' is given,
+        # the conversion runs under cProfile and the statistics are dumped to that file.
+        # When 'index_file' is given, a typology index (see typologyindex) is written next to the XML.
+        self.progress = progress
+        self.instrument = instrument
+        self.stage_records = []
+        try:
+            if cache is not None:
+                self.begin_stage("cache")
+                cache_key = cache.get_key(self.location, sheet_name)
+                if cache.fetch(cache_key, xml_file):
+                    self.end_stage(bytes_written=os.path.getsize(xml_file))
+                    if index_file is not None:
+                        # The cached conversion wasn't parsed, so index the XML file itself.
+                        self.write_index(index_file, xml_file)
+                    return True, ""
+                self.end_stage()
+
+            if profile_file is None:
+                success, message = self.convert_to_xml_uncached(sheet_name, xml_file, stream, verify_file)
+            else:
+                import cProfile
+                profiler = cProfile.Profile()
+                try:
+                    success, message = profiler.runcall(self.convert_to_xml_uncached, sheet_name, xml_file,
+                                                        stream, verify_file)
+                finally:
+                    profiler.dump_stats(profile_file)
+
+            if success and cache is not None:
+                cache.store(cache_key, xml_file)
+            if success and index_file is not None:
+                # Streamed conversions don't keep a tree in memory, so index the XML file.
+                self.write_index(index_file, xml_file if self.typology_element is None else None)
+            return success, message
+        except Exception as e:
+            # Return False and the exception message if an error occurs.
+            return False, str(e)
+        finally:
+            self.end_stage()
+
+    def convert_to_stream(self, sheet_name, output, stream=False, verify_file=False, progress=None, instrument=None):
+        # Convert a sheet and write the XML to 'output', a binary file-like object, without touching the disk.
+        # Unless 'stream' is True, the typology is validated before anything is written to 'output'.
+        # With 'stream' or 'verify_file', the written XML is read back from 'output' to validate it,
+        # so it must also be readable and seekable.
+        # 'progress' and 'instrument' work as in convert_to_xml. Return success and an error message.
+        self.progress = progress
+        self.instrument = instrument
+        self.stage_records = []
+        if (stream or verify_file) and not (output.readable() and output.seekable()):
+            # Check before anything is written, since the XML couldn't be validated afterwards.
+            return False, "The output must be readable and seekable to validate the XML written to it"
+        try:
+            return self.convert_to_xml_uncached(sheet_name, output, stream, verify_file)
+        finally:
+            self.end_stage()
+
+    def convert_to_bytes(self, sheet_name, stream=False, progress=None, instrument=None):
+        # Convert a sheet in memory. Return success, an error message and the validated XML as bytes.
+        output = io.BytesIO()
+        success, message = self.convert_to_stream(sheet_name, output, stream, progress=progress,
+                                                  instrument=instrument)
+        return success, message, output.getvalue() if success else b""
+
+    def convert_to_xml_uncached(self, sheet_name, xml_file, stream=False, verify_file=False):
+        # 'xml_file' can be a path or a binary file-like object, see convert_to_stream.
+        from lxml import etree
+
+        # Remember where the XML starts in a file object, to count the bytes written and to read it back.
+        start = None
+        if not is_path(xml_file):
+            start = xml_file.tell() if xml_file.seekable() else 0
         try:
             # Create the root element for the XML file.
-            typology_file = et.Element("typology", edition="MQM2021")
-
-            # Check if the selected worksheet exists in the Excel file.
-            if sheet_name not in self.get_sheet_names():
-                return "Couldn't identify a worksheet to open"
-
-            # Parse the specified sheet and fill any missing values
-            mqm_index = self.find_mqm_and_prepare_df(sheet_name)
-            self.df.fillna("", inplace=True)
+            typology_file = etree.Element("typology", edition="MQM2021")
+            self.typology_element = None
 
-            # Reset the issue maps for a fresh conversion.
-            self.issue_element_map = {}
-            self.issue_id_map = {}
-            # Parse the worksheet and check for any errors.
-            success, message = self.parse_worksheet(mqm_index)
+            # Parse the sheet. Streamed error types are written straight from their rows, so no elements are built.
+            success, message, order = self.build_typology(sheet_name, None if stream else typology_file,
+                                                          build_elements=not stream)
             if not success:
                 return success, message
 
-            # Recursively nest error type elements in the XML structure.
-            ids = self.issue_id_map[""]
-            self.nest_error_type_elements_recursively(ids, typology_file)
-
-            # Write the XML structure to a file.
-            tree = et.ElementTree(typology_file)
-            et.indent(tree, space="\t", level=0)
-            tree.write(xml_file, encoding="utf-8", xml_declaration=True)
+            if stream:
+                # Stream the error types to the file depth-first.
+                self.begin_stage("write")
+                self.write_xml_incrementally(order, xml_file)
+                self.end_stage(elements=len(order), bytes_written=self.get_written_size(xml_file, start))
+            else:
+                self.typology_element = typology_file
+
+                # Validate the tree in memory so that an invalid file is never written.
+                self.begin_stage("validate")
+                success, message = self.validate_element(typology_file)
+                self.end_stage(elements=len(order))
+                if not success:
+                    return success, message
+
+                # Write the XML structure to a file.
+                self.begin_stage("write")
+                self.write_xml(typology_file, xml_file)
+                self.end_stage(elements=len(order), bytes_written=self.get_written_size(xml_file, start))
+                if not verify_file:
+                    return True, ""
 
             # Validate the generated XML file.
-            return self.validate_xml(xml_file)
+            self.begin_stage("validate")
+            if start is not None:
+                xml_file.seek(start)
+            success, message = self.validate_xml(xml_file)
+            self.end_stage(elements=len(order))
+            return success, message
         except Exception as e:
             # Return False and the exception message if an error occurs.
             return False, str(e)
 
-    def parse_worksheet(self, mqm_index):
+    @staticmethod
+    def get_written_size(xml_file, start=None):
+        # Return the size of a written XML file, or the bytes written to a file object since 'start'.
+        if start is None:
+            return os.path.getsize(xml_file)
+        # What was written to an unseekable stream can't be measured.
+        return xml_file.tell() - start if xml_file.seekable() else 0
+
+    def write_index(self, index_file, xml_file=None):
+        # Write a typology index of the last conversion, or of 'xml_file' when it is given.
+        from typologyindex import iter_order_nodes, iter_xml_nodes, write_typology_index
+
+        self.begin_stage("index")
+        if xml_file is None:
+            nodes = iter_order_nodes(self.order_error_types(), self.issue_element_map)
+        else:
+            nodes = iter_xml_nodes(xml_file)
+        write_typology_index(nodes, index_file)
+        self.end_stage(bytes_written=os.path.getsize(index_file))
+
+    def build_typology(self, sheet_name, typology_element=None, build_elements=True):
+        # Load and parse a sheet, then order its error types and check the hierarchy.
+        # When 'typology_element' is given, the error types are nested under it.
+        # When 'build_elements' is False, the normalized rows are kept in 'issue_rows' instead of elements.
+        # Return success, an error message and the (row_id, depth) order of the error types.
+
+        # Check if the selected worksheet exists in the Excel file.
+        if sheet_name not in self.open_input_file():
+            return False, "Couldn't identify a worksheet to open", []
+
+        # Parse the specified sheet into a DataFrame.
+        self.begin_stage("load")
+        mqm_index = self.find_mqm_and_prepare_df(sheet_name)
+        self.end_stage(rows=len(self.df) - 1)
+
+        # Reset the issue maps for a fresh conversion.
+        self.issue_element_map = {}
+        self.issue_id_map = {}
+        self.issue_row_map = {}
+        self.issue_rows = {}
+        # Parse the worksheet and check for any errors.
+        self.begin_stage("parse")
+        success, message = self.parse_worksheet(mqm_index, build_elements)
+        self.end_stage(rows=len(self.df) - 1, elements=len(self.issue_element_map))
+        if not success:
+            return success, message, []
+
+        # Order the error types depth-first and check that every one of them was reached.
+        self.begin_stage("nest")
+        order = self.order_error_types()
+        problems = self.find_hierarchy_problems(order)
+        if problems:
+            return False, "\n".join(problems), []
+
+        if typology_element is not None:
+            # Nest error type elements in the XML structure.
+            self.nest_error_type_elements(order, typology_element)
+        self.end_stage(elements=len(order))
+        return True, "", order
+
+    def convert_all_to_xml(self, output, sheet_names=None, combined=False, progress=None, instrument=None):
+        # Convert several sheets of the workbook to XML. The workbook, and its shared strings, are read once.
+        # 'sheet_names' defaults to every sheet with an "MQM" header; other sheets are skipped after
+        # reading only their leading rows.
+        # When 'combined' is False, 'output' is a directory and each sheet is written to '<sheet name>.xml',
+        # see get_sheet_file_names.
+        # When 'combined' is True, the error types of all the sheets are written to the single file 'output'.
+        # Return a list of (sheet_name, xml_file, success, message) tuples.
+        from lxml import etree
+
+        self.progress = progress
+        self.instrument = instrument
+        self.stage_records = []
+        try:
+            if sheet_names is None:
+                # Open the workbook and scan the leading rows of each sheet for the "MQM" header.
+                self.begin_stage("open")
+                sheet_names = self.get_mqm_sheet_names()
+                self.end_stage()
+            if not sheet_names:
+                return [(None, None, False, "MQM not found in any sheet")]
+
+            if not combined:
+                file_names = self.get_sheet_file_names(sheet_names)
+                results = []
+                for sheet_name in sheet_names:
+                    xml_file = os.path.join(output, file_names[sheet_name])
+                    success, message = self.convert_to_xml_uncached(sheet_name, xml_file)
+                    self.end_stage()
+                    results.append((sheet_name, xml_file, success, message))
+                return results
+
+            # Nest the error types of every sheet under a single typology element.
+            typology_file = etree.Element("typology", edition="MQM2021")
+            element_count = 0
+            for sheet_name in sheet_names:
+                success, message, order = self.build_typology(sheet_name, typology_file)
+                if not success:
+                    return [(sheet_name, output, False, message)]
+                element_count += len(order)
+
+            self.begin_stage("validate")
+            success, message = self.validate_element(typology_file)
+            self.end_stage(elements=element_count)
+            if not success:
+                return [(None, output, False, message)]
+
+            self.begin_stage("write")
+            self.write_xml(typology_file, output)
+            self.end_stage(elements=element_count, bytes_written=os.path.getsize(output))
+            self.typology_element = typology_file
+            return [(None, output, True, "")]
+        except Exception as e:
+            return [(None, output, False, str(e))]
+        finally:
+            self.end_stage()
+
+    @staticmethod
+    def get_sheet_file_names(sheet_names):
+        # Return a dictionary mapping each sheet name to the name of its XML file. Characters other than letters,
+        # digits, '_' and '-' become '_', and sheets whose names would then clash, such as "A B" and "A/B",
+        # get their position in 'sheet_names' appended. Raise ValueError if two sheets would still share a file.
+        file_names = {sheet_name: re.sub(r"[^\w-]+", "_", sheet_name) for sheet_name in sheet_names}
+        counts = collections.Counter(os.path.normcase(file_name) for file_name in file_names.values())
+        for position, sheet_name in enumerate(sheet_names, start=1):
+            if counts[os.path.normcase(file_names[sheet_name])] > 1:
+                file_names[sheet_name] += f"_{position}"
+
+        owners = {}
+        for sheet_name, file_name in file_names.items():
+            owner = owners.setdefault(os.path.normcase(file_name), sheet_name)
+            if owner != sheet_name:
+                raise ValueError(f"Sheets {owner} and {sheet_name} would both be written to {file_name}.xml")
+            file_names[sheet_name] = file_name + ".xml"
+        return file_names
+
+    def parse_worksheet(self, mqm_index, build_elements=True):
+        # Read and normalize the rows of the worksheet.
+        success, message, rows = self.read_worksheet_rows(mqm_index)
+        if not success:
+            return success, message
+
+        # Check every row before building anything, and report all the problems at once.
+        problems = self.validate_rows(rows)
+        if problems:
+            return False, "\n".join(problems)
+
+        # The ids were checked to be unique, so each one is stored once.
+        self.index_rows(rows)
+        if build_elements:
+            self.build_error_type_elements(rows)
+        else:
+            # Keep the rows for a streamed conversion, which writes them without building elements.
+            self.issue_rows = {row[1]: row for row in rows}
+
+        # After processing all rows, return True to indicate successful parsing with no error message.
+        return True, ""
+
+    def build_error_type_elements(self, rows):
+        # Build the error type elements row by row from the normalized rows of read_worksheet_rows.
+        for index, (name, row_id, _, pid, description, examples, notes) in enumerate(rows, start=1):
+            if index % PROGRESS_INTERVAL == 0:
+                self.report_progress("parse")
+            self.issue_element_map[row_id] = self.create_error_type_element(name, row_id, pid, description,
+                                                                           examples, notes)
+
+    def index_rows(self, rows):
+        # Store the sheet row of each id in 'issue_row_map', and the ids of each parent's children,
+        # in sheet order, in 'issue_id_map'.
+        for index, (_, row_id, parent, _, _, _, _) in enumerate(rows, start=1):
+            self.issue_row_map[row_id] = self.row_numbers[index]
+            self.issue_id_map.setdefault(parent, []).append(row_id)
+
+    def read_worksheet_rows(self, mqm_index):
+        # Return success, an error message and the normalized rows of the worksheet as
+        # (name, id, parent, PID, description, examples, notes) tuples.
+
         # Identify the columns in the worksheet by their headers.
-        header_row = self.df.iloc[0]
-        name_column = None
-        id_column = None
-        parent_column = None
-        description_column = None
-        examples_column = None
-        notes_column = None
-        pid_column = None
+        columns = self.map_columns(self.df.iloc[0])
 
+        # Check if the necessary columns were found.
+        if None in columns.values():
+            return False, ("The necessary columns were not found. "
+                           "Expected Name, Type ID, Parent, Type PID, Description, Examples, and Notes."), []
+        name_column = columns["Name"]
+        id_column = columns["Type ID"]
+        parent_column = columns["Parent"]
+        pid_column = columns["Type PID"]
+        description_column = columns["Description"]
+        examples_column = columns["Examples"]
+        notes_column = columns["Notes"]
+
+        # Pull each needed column out of the data rows once. The first row is the header, so start at index 1.
+        data = self.df.iloc[1:]
+
+        def column(idx):
+            # Fill missing values in this column only and make every cell a string.
+            return data.iloc[:, idx].fillna("").astype(str)
+
+        def text_column(idx):
+            # Replace newlines with '<br/>' and strip surrounding whitespace across the whole column.
+            return column(idx).str.replace("\n", "<br/>", regex=False).str.strip()
+
+        # Normalize the columns in bulk before building any elements. Blank fields are reported by validate_rows.
+        names = column(name_column).str.strip().tolist()
+        row_ids = column(id_column).tolist()
+        parents = column(parent_column).tolist()
+        pids = column(pid_column).str.strip().tolist()
+        descriptions = text_column(description_column).tolist()
+        examples_list = text_column(examples_column).tolist()
+        notes_list = text_column(notes_column).tolist()
+
+        rows = zip(names, row_ids, parents, pids, descriptions, examples_list, notes_list)
+        return True, "", list(rows)
+
+    @staticmethod
+    def map_columns(header_row):
+        # Return a dictionary mapping each expected column (Name, Type ID, Parent, Type PID, Description,
+        # Examples and Notes) to its index in the header row, or to None if the header row doesn't have it.
+        columns = dict.fromkeys(("Name", "Type ID", "Parent", "Type PID", "Description", "Examples", "Notes"))
         for idx, cell in enumerate(header_row):
-            header = cell.lower()
+            header = cell.lower() if isinstance(cell, str) else ""
             # Map column names to their indices based on headers.
             if "name" in header:
-                name_column = idx
+                columns["Name"] = idx
             elif "type id" in header:
-                id_column = idx
+                columns["Type ID"] = idx
             elif "parent" in header:
-                parent_column = idx
+                columns["Parent"] = idx
             elif "description" in header:
-                description_column = idx
+                columns["Description"] = idx
             elif "examples" in header:
-                examples_column = idx
+                columns["Examples"] = idx
             elif "notes" in header:
-                notes_column = idx
+                columns["Notes"] = idx
             elif "type pid" in header:
-                pid_column = idx
-
-        # Check if the necessary columns were found.
-        if None in (name_column, description_column, examples_column, notes_column):
-            return False, "The necessary columns were not found. Expected Name, Description, Examples, and Notes."
-
-        # Process each row in the worksheet. The first row is the header, so start at index 1.
-        for index in range(1, len(self.df)):
-            row = self.df.iloc[index]  # Retrieve the current row of data.
-
-            # Extract the 'name' value from the row. This is the name of the error type.
-            name = row.iloc[name_column]
-
-            # If the 'name' is empty, return an error message indicating the problem.
+                columns["Type PID"] = idx
+        return columns
+
+    def validate_rows(self, rows):
+        # Check the rows from read_worksheet_rows in a single pass and return a list of every problem found:
+        # blank names, ids and PIDs, ids the schema doesn't allow, duplicate ids and parents that aren't ids.
+        problems = []
+        # 'id_rows' maps each id to the sheet rows it appears on, and 'parent_rows' each parent to its children's rows.
+        id_rows = {}
+        parent_rows = {}
+        for index, (name, row_id, parent, pid, _, _, _) in enumerate(rows, start=1):
+            row = self.row_numbers[index]
             if not name:
-                return False, f"An error cannot have a blank id. Row: {index + mqm_index}"
-
-            # Extract the 'id' value from the row. This is the unique identifier for the error type.
-            row_id = row.iloc[id_column]
-
-            # If the 'id' is empty, return an error message indicating the problem.
+                problems.append(f"An error cannot have a blank name. Row: {row}")
             if not row_id:
-                return False, f"An error cannot have a blank id. Error name: {name}, Row: {index + 2}"
-
-            # Extract the 'parent', 'description', 'examples', and 'notes' values from the row.
-            parent = row.iloc[parent_column]
-            description = row.iloc[description_column].replace('\n', '<br/>').strip()
-            examples = row.iloc[examples_column].replace('\n', '<br/>').strip()
-            notes = row.iloc[notes_column].replace('\n', '<br/>').strip()
-            pid = row.iloc[pid_column].strip()
-
-            # Create an XML element for the error type and set its 'name' and 'id' attributes.
-            element = et.Element("errorType")
-            element.set("name", name.strip())
-            element.set("id", row_id)
-            element.set("PID", pid)
-
-            # Create sub-elements for the 'description', 'notes', and 'examples' values.
-            description_element = et.Element("description")
-            description_element.text = description
-            notes_element = et.Element("notes")
-            notes_element.text = notes
-            examples_element = et.Element("examples")
-            examples_element.text = examples
-
-            # Append the sub-elements to the error type element.   
-            element.append(description_element)
-            element.append(notes_element)
-            element.append(examples_element)
-
-            # Store the error type element in the issue_element_map dictionary.
-            if row_id not in self.issue_element_map:
-                # If the row_id is not in the map, store the element with the row_id as the key.
-                self.issue_element_map[row_id] = element
+                problems.append(f"An error cannot have a blank id. Error name: {name}, Row: {row}")
             else:
-                # If the row_id is already in the map, append a '2' to the key and store the element.
-                self.issue_element_map[row_id + str(mqm_index)] = element
+                if not is_valid_id(row_id):
+                    problems.append(f"Id {row_id} may only contain letters, digits, symbols and '-'. Row: {row}")
+                id_rows.setdefault(row_id, []).append(row)
+            if not pid:
+                problems.append(f"An error cannot have a blank PID. Id: {row_id}, Row: {row}")
+            if parent:
+                parent_rows.setdefault(parent, []).append(row)
+
+        for row_id, id_row_list in id_rows.items():
+            if len(id_row_list) > 1:
+                problems.append(f"Duplicate id {row_id}. Rows: {', '.join(map(str, id_row_list))}")
+        for parent, child_rows in parent_rows.items():
+            if parent not in id_rows:
+                problems.append(f"Parent {parent} does not exist as an id. Rows: {', '.join(map(str, child_rows))}")
+        return problems
 
-            # Store the row_id in the issue_id_map dictionary with the parent as the key.
-            if parent not in self.issue_id_map:
-                # If the parent is not in the map, store the row_id in a list with the parent as the key.
-                self.issue_id_map[parent] = [row_id]
-            else:
-                # Store the row_id in the list for the parent key.
-                if row_id in self.issue_id_map[parent]:
-                    # If the row_id is already in the list, append a '2' to the row_id and store it.
-                    self.issue_id_map[parent].append(row_id + mqm_index)
-                else:
-                    # If the row_id is not in the list, store it in the list for the parent key.
-                    self.issue_id_map[parent].append(row_id)
+    @staticmethod
+    def create_error_type_element(name, row_id, pid, description, examples, notes):
+        from lxml import etree
+
+        # Create an XML element for the error type and set its 'name' and 'id' attributes.
+        element = etree.Element("errorType")
+        element.set("name", name)
+        element.set("id", row_id)
+        element.set("PID", pid)
+
+        # Create sub-elements for the 'description', 'notes', and 'examples' values.
+        description_element = etree.SubElement(element, "description")
+        description_element.text = description
+        notes_element = etree.SubElement(element, "notes")
+        notes_element.text = notes
+        examples_element = etree.SubElement(element, "examples")
+        examples_element.text = examples
+        return element
+
+    def begin_stage(self, stage):
+        # Start timing a stage and tell the progress callback about it.
+        self.end_stage()
+        self.current_stage = (stage, time.perf_counter(), get_peak_memory())
+        self.report_progress(stage)
+
+    def end_stage(self, rows=0, elements=0, bytes_written=0):
+        # Record the stage that is running, if any, and pass the record to the instrument callback.
+        # A record holds the stage name, its duration in seconds, the rows processed, the elements built,
+        # the bytes written and how much the process's peak memory grew in bytes (None where unavailable).
+        if self.current_stage is None:
+            return
+        stage, start, peak_memory = self.current_stage
+        self.current_stage = None
+        peak_memory_after = get_peak_memory()
+        record = {
+            "stage": stage,
+            "seconds": time.perf_counter() - start,
+            "rows": rows,
+            "elements": elements,
+            "bytes_written": bytes_written,
+            "peak_memory_delta": None if peak_memory is None else peak_memory_after - peak_memory,
+        }
+        self.stage_records.append(record)
+        if self.instrument is not None:
+            self.instrument(record)
+
+    def report_progress(self, stage):
+        # Tell the progress callback, if any, which stage the conversion is in.
+        if self.progress is not None:
+            self.progress(stage)
+
+    def get_mqm_sheet_names(self):
+        # Return the names of the sheets with an "MQM" header row among their leading rows.
+        # Only those rows are decoded, so other sheets are skipped cheaply.
+        return [sheet_name for sheet_name in self.get_sheet_names()
+                if self.find_mqm_row(self.iter_sheet_rows(sheet_name, MQM_HEADER_SCAN_ROWS)) is not None]
+
+    def iter_sheet_rows(self, sheet_name, max_rows=None):
+        # Stream the rows of the sheet as tuples of cell values from the input file's reader.
+        return self.reader.iter_rows(sheet_name, max_rows)
+
+    def get_sheet_dimensions(self, sheet_name):
+        # Return the (rows, columns) of the sheet if the file declares them, otherwise None.
+        return self.reader.get_dimensions(sheet_name)
 
-        # After processing all rows, return True to indicate successful parsing with no error message.
-        return True, ""
+    @staticmethod
+    def find_mqm_row(rows):
+        # Consume rows until the first one containing "MQM" and return its index, or None if there is none.
+        for index, row in enumerate(rows):
+            if any(isinstance(cell, str) and "MQM" in cell for cell in row):
+                return index
+        return None
 
     def find_mqm_and_prepare_df(self, sheet_name):
-        # Read the whole sheet to a temporary DataFrame
-        temp_df = pd.read_excel(self.location, sheet_name=sheet_name, header=None)
-        mqm_row_index = None
-
-        # Find the row index containing "MQM"
-        for index, row in temp_df.iterrows():
-            if row.str.contains("MQM").any():
-                mqm_row_index = index
-                break
+        import pandas as pd
 
-        # If "MQM" is found, read the file again, setting headers appropriately
-        if mqm_row_index is not None:
-            self.df = pd.read_excel(self.location, sheet_name=sheet_name, header=mqm_row_index)
-        else:
+        # Scan the leading rows only, stopping at the first row containing "MQM"
+        rows = self.iter_sheet_rows(sheet_name)
+        mqm_row_index = self.find_mqm_row(rows)
+
+        if mqm_row_index is None:
             raise ValueError("MQM not found in any row")
+
+        # Build the DataFrame from the remaining rows of the same stream, so the sheet is only decoded once.
+        # Blank rows are skipped, matching what pd.read_excel does, and the sheet row number of each
+        # DataFrame row is kept in 'row_numbers' for error messages.
+        data = []
+        self.row_numbers = []
+        for index, row in enumerate(rows, start=1):
+            if index % PROGRESS_INTERVAL == 0:
+                self.report_progress("load")
+            if any(cell is not None and cell != "" for cell in row):
+                data.append(row)
+                self.row_numbers.append(mqm_row_index + 1 + index)
+        self.df = pd.DataFrame(data, dtype=object)
         return mqm_row_index + 2
 
-    def nest_error_type_elements_recursively(self, ids, parent_element, depth=0):
-        # Recursively nest error type elements in the XML structure based on their parent-child relationships.
-        for row_id in ids:
+    def order_error_types(self):
+        # Walk the hierarchy depth-first with an explicit stack, so any depth is supported.
+        # Return (row_id, depth) pairs in document order.
+        order = []
+        placed = set()
+        stack = [(row_id, 0) for row_id in reversed(self.issue_id_map.get("", []))]
+        while stack:
+            row_id, depth = stack.pop()
+            # An id listed under more than one parent is only placed once, so the walk always ends.
+            if row_id in placed:
+                continue
+            placed.add(row_id)
+            order.append((row_id, depth))
+            # Push the children in reverse so they are visited in sheet order.
+            stack.extend((child_id, depth + 1) for child_id in reversed(self.issue_id_map.get(row_id, [])))
+        return order
+
+    def find_hierarchy_problems(self, order):
+        # Report the error types that were not reached from the top level: children of missing parents,
+        # members of parent/child cycles, and duplicate ids. Also report the first error type nested deeper
+        # than MAX_PARSE_DEPTH levels.
+        problems = []
+        for row_id, depth in order:
+            if depth >= MAX_PARSE_DEPTH:
+                problems.append(f"Error type {row_id} is nested {depth + 1} levels deep, but typology XML can't be "
+                                f"read back with more than {MAX_PARSE_DEPTH} levels. Row: {self.issue_row_map[row_id]}")
+                break
+
+        placed = {row_id for row_id, _ in order}
+        if len(placed) == len(self.issue_row_map):
+            return problems
+
+        # Map each id back to its parent.
+        parent_map = {}
+        for parent, ids in self.issue_id_map.items():
+            for row_id in ids:
+                parent_map.setdefault(row_id, parent)
+
+        resolved = set(placed)
+        for row_id in self.issue_row_map:
+            if row_id in resolved:
+                continue
+            if row_id not in parent_map:
+                resolved.add(row_id)
+                problems.append(f"Duplicate id. Row: {self.issue_row_map[row_id]}")
+                continue
+
+            # Follow the parents upwards until reaching an id that was already handled,
+            # a parent that does not exist, or an id already on the current path.
+            path = []
+            on_path = {}
+            current = row_id
+            while current not in resolved:
+                if current in on_path:
+                    cycle = path[on_path[current]:]
+                    rows = ", ".join(str(self.issue_row_map[cycle_id]) for cycle_id in cycle)
+                    problems.append(f"Parent cycle between ids {', '.join(cycle)}. Rows: {rows}")
+                    break
+                if current not in self.issue_row_map:
+                    children = self.issue_id_map[current]
+                    rows = ", ".join(str(self.issue_row_map[child_id]) for child_id in children)
+                    problems.append(f"Parent {current} does not exist as an id. Rows: {rows}")
+                    break
+                on_path[current] = len(path)
+                path.append(current)
+                current = parent_map[current]
+            resolved.update(path)
+            resolved.add(current)
+        return problems
+
+    def nest_error_type_elements(self, order, typology_element):
+        # Nest error type elements in the XML structure based on their parent-child relationships.
+        # 'parents' holds the open element at each depth, starting with the typology element.
+        parents = [typology_element]
+        for row_id, depth in order:
             # Get the error type element for the current row_id.
             element = self.issue_element_map[row_id]
             # Set the 'level' attribute of the element to the current depth in the XML structure.
             element.set("level", str(depth))
-            if row_id in self.issue_id_map:
-                # If the current row_id has children, recursively nest the children under the current element.
-                self.nest_error_type_elements_recursively(self.issue_id_map[row_id], element, depth + 1)
+            # Append the current element to its parent, which is the open element one level up.
+            del parents[depth + 1:]
+            parents[depth].append(element)
+            parents.append(element)
 
-            # Append the current element to the parent element.
-            parent_element.append(element)
+    @staticmethod
+    def write_xml(typology_element, xml_file):
+        # Indent the typology tree with tabs and write it to a file.
+        from lxml import etree
+
+        tree = etree.ElementTree(typology_element)
+        etree.indent(tree, space="\t", level=0)
+        tree.write(xml_file, encoding="utf-8", xml_declaration=True)
+
+    def write_xml_incrementally(self, order, xml_file):
+        # Write the typology straight from the rows in 'issue_rows', PROGRESS_INTERVAL error types at a time,
+        # so neither the nested tree nor an element for every error type is held in memory.
+        # The XML is laid out exactly as write_xml lays it out.
+        if is_path(xml_file):
+            try:
+                with open(xml_file, "wb") as file:
+                    self.write_xml_incrementally(order, file)
+            except Exception:
+                # Don't leave a truncated file behind when a row can't be written.
+                os.remove(xml_file)
+                raise
+            return
+
+        xml_file.write(XML_HEADER)
+        for start in range(0, len(order), PROGRESS_INTERVAL):
+            self.report_progress("write")
+            end = start + PROGRESS_INTERVAL
+            rows = [(name, row_id, pid, description, examples, notes, depth)
+                    for row_id, depth in order[start:end]
+                    for name, _, _, pid, description, examples, notes in [self.issue_rows[row_id]]]
+            xml_file.write(serialize_error_types(rows, order[end][1] if end < len(order) else -1))
+        xml_file.write(XML_FOOTER)
 
     @staticmethod
-    def validate_xml(xml_file):
-        # Validate the generated XML file against a schema.
+    def validate_element(root_element):
+        # Validate an in-memory typology element against the cached schema.
+        from lxml import etree
+
+        try:
+            get_xsd_schema().assertValid(root_element)
+            return True, ""
+        except etree.DocumentInvalid:
+            return False, "Typology failed validation, so the file was not written"
 
-        # Get the directory where the application's resources are stored.
-        bundle_dir = getattr(sys, '_MEIPASS', os.path.abspath(os.path.dirname(__file__)))
-        source_file = os.path.join(bundle_dir, "typologySchema.xsd")
+    @staticmethod
+    def validate_xml(xml_file):
+        # Validate the generated XML file against the schema while parsing it. Each error type is cleared
+        # once it has been checked, so the whole tree is never built.
+        from lxml import etree
 
-        # Parse the schema and the XML file.
-        xsd_schema = etree.XMLSchema(etree.parse(source_file))
-        # Parse the XML file.
-        lxml_root_element = etree.parse(xml_file)
         try:
-            # Attempt to validate the XML file against the schema.
-            xsd_schema.assertValid(lxml_root_element)
+            for _, element in etree.iterparse(xml_file, tag="errorType", schema=get_xsd_schema(), huge_tree=True):
+                element.clear()
+                # Drop the cleared error types before this one as well.
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
             # If the validation is successful, return True and an empty string.
             return True, ""
-        except etree.DocumentInvalid:
+        except etree.XMLSyntaxError as e:
+            if e.error_log.last_error is None or e.error_log.last_error.domain != etree.ErrorDomains.SCHEMASV:
+                raise
             # If the validation fails, return False and an error message.
             return False, "File was written, but failed validation"
@@ -0,0 +1,149 @@
+import argparse
+import os
+import sys
+import tempfile
+
+from xlsxfile import XlsxFile
+
+# The column headers written to the worksheet, in the layout XlsxFile reads.
+HEADERS = ["Name", "Type ID", "Parent", "Type PID", "Description", "Examples", "Notes"]
+
+
+def iter_typology_rows(xml_file):
+    """
+    Streams the error types of a typology XML file as worksheet rows, in document order.
+
+    Each row is [name, id, parent id, PID, description, examples, notes], with '<br/>' mapped back to newlines.
+    Elements are cleared as soon as they are read, so memory stays flat regardless of the typology size.
+    """
+    from lxml import etree
+
+    # 'open_rows' holds the row of each errorType element that is still open, and whether it was yielded.
+    open_rows = []
+    for event, element in etree.iterparse(xml_file, events=("start", "end"), huge_tree=True):
+        tag = element.tag
+        if tag == "errorType":
+            if event == "start":
+                # The parent's description, notes and examples come before its children, so its row is complete.
+                if open_rows and not open_rows[-1][1]:
+                    open_rows[-1][1] = True
+                    yield open_rows[-1][0]
+                parent = open_rows[-1][0][1] if open_rows else None
+                row = [element.get("name"), element.get("id"), parent, element.get("PID"), "", "", ""]
+                open_rows.append([row, False])
+            else:
+                row, yielded = open_rows.pop()
+                if not yielded:
+                    yield row
+                # Free the finished element and the siblings before it.
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+        elif event == "end" and tag in ("description", "examples", "notes") and open_rows:
+            text = (element.text or "").replace("<br/>", "\n")
+            open_rows[-1][0][4 + ("description", "examples", "notes").index(tag)] = text
+            element.clear()
+
+
+def make_text_cells(sheet, row):
+    """
+    Turns the text values of a row into cells that are always written as text.
+
+    openpyxl writes any string starting with '=' as a formula, so a name like "=Total" would be read back blank.
+    """
+    from openpyxl.cell import WriteOnlyCell
+
+    cells = []
+    for value in row:
+        if isinstance(value, str):
+            cell = WriteOnlyCell(sheet, value)
+            cell.data_type = "s"
+            value = cell
+        cells.append(value)
+    return cells
+
+
+def convert_xml_to_xlsx(xml_file, xlsx_file, sheet_name="Typology"):
+    """
+    Converts a typology XML file to a workbook that XlsxFile.convert_to_xml can convert back.
+
+    Parameters:
+    - xml_file: The typology XML file to read.
+    - xlsx_file: The XLSX file to write.
+    - sheet_name: The name of the worksheet to create.
+
+    Returns:
+    - A tuple of success and an error message.
+    """
+    from openpyxl import Workbook
+
+    # Write-only mode streams rows to disk instead of keeping the worksheet in memory.
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    try:
+        sheet.append(["MQM Typology"])
+        sheet.append(HEADERS)
+        for row in iter_typology_rows(xml_file):
+            sheet.append(make_text_cells(sheet, row))
+        workbook.save(xlsx_file)
+        return True, ""
+    except Exception as e:
+        # Finish the sheet's temporary file, or openpyxl prints tracebacks when it is discarded half-written.
+        sheet.close()
+        return False, str(e)
+
+
+def verify_round_trip(xml_file):
+    """
+    Converts a typology XML file to XLSX and back, and checks that the result matches the original.
+
+    Returns:
+    - A tuple of success and an error message.
+    """
+    from lxml import etree
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        xlsx_file = os.path.join(temp_dir, "typology.xlsx")
+        round_trip_file = os.path.join(temp_dir, "typology.xml")
+
+        success, message = convert_xml_to_xlsx(xml_file, xlsx_file)
+        if not success:
+            return success, message
+        worksheet = XlsxFile(xlsx_file)
+        success, message = worksheet.convert_to_xml("Typology", round_trip_file)
+        worksheet.reload()
+        if not success:
+            return success, message
+
+        # Compare the canonical forms, ignoring indentation.
+        parser = etree.XMLParser(remove_blank_text=True, huge_tree=True)
+        original = etree.tostring(etree.parse(xml_file, parser), method="c14n")
+        round_trip = etree.tostring(etree.parse(round_trip_file, parser), method="c14n")
+    if original != round_trip:
+        return False, "The typology changed in the round trip"
+    return True, ""
+
+
+def main(argv=None):
+    """
+    Converts a typology XML file back to an MQM typology workbook.
+    """
+    parser = argparse.ArgumentParser(description="Convert typology XML back to an MQM typology workbook.")
+    parser.add_argument("xml_file", help="typology XML file to read")
+    parser.add_argument("xlsx_file", help="XLSX file to write")
+    parser.add_argument("-s", "--sheet", default="Typology", dest="sheet_name", help="worksheet name")
+    parser.add_argument("--verify", action="store_true",
+                        help="also check that converting the workbook back gives the same typology")
+    args = parser.parse_args(argv)
+
+    success, message = convert_xml_to_xlsx(args.xml_file, args.xlsx_file, args.sheet_name)
+    if success and args.verify:
+        success, message = verify_round_trip(args.xml_file)
+    if not success:
+        print(f"Conversion failed: {message}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())